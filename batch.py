@@ -0,0 +1,295 @@
+'''
+Batch analysis of many slope sections ( cross-sections ) from model files
+
+    python batch.py sections.json more_sections.csv -o results.csv --processes 8
+    python batch.py sections.json -o results.csv               # rerun: finished sections are skipped
+    python batch.py sections.json -o results.csv --restart     # recalculate all
+
+JSON files hold one section or a list of sections:
+
+    {
+        "name": "P 1200",
+        "layers": [ { "x": [-50,0,20,70], "y": [0,0,10,10], "gamma": 19, "a": 10, "phi": 29, "cu": 32, "undrained": true } ],
+        "gw": { "x": [-50,70], "y": [0,1.8] },
+        "rock": { "x": [-50,70], "y": [-10,-10] },
+        "search_field": { "x_from": -1, "y_from": 11, "x_to": 21, "y_to": 36, "upper_tangent": -0.5, "lower_tangent": -10 },
+        "increments": { "n_x": 20, "n_y": 20, "n_r": 15 },
+        "n_lamelle": 30, "method": "Bishop", "prune": false
+    }
+
+"simple_geom": { "H": 10, "L": 20, "D_ROCK": 10, ... } can be given instead of layers/rock ( SOIL_MODEL.simple_geom ).
+layers, gw and rock can be read from surveyed point files, simplified with "tolerance" ( profiles.import_profile ):
+    { "profile": "P1200_terrain.csv", "tolerance": 0.05, "gamma": 19, ... }
+
+CSV files hold polyline points, one row per point, layer parameters are read from the first point of each layer:
+
+    section,kind,id,x,y,gamma,a,phi,cu,undrained
+    P 1200,layer,0,-50,0,19,10,29,32,1
+    P 1200,layer,0,0,0,,,,,
+    P 1200,gw,,-50,0,,,,,
+    P 1200,rock,,-50,-10,,,,,
+
+kind is layer, gw or rock, layers are added in order of id. search_field, increments etc. of CSV sections
+( and missing values in JSON sections ) come from --defaults ( JSON file ).
+
+One row per section is appended to the results file ( CSV ) as soon as the section is done, sections already
+in the results file with status ok and unchanged definition are skipped, so interrupted batches can be resumed.
+'''
+
+from model import SOIL_MODEL
+from stability import sircular_cylindric_fs
+from methods import get_method
+from profiles import import_profile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import argparse
+import hashlib
+import json
+import time
+import csv
+import sys
+import os
+
+DEFAULTS = {
+    'search_field': None, # required
+    'increments': { 'n_x': 10, 'n_y': 10, 'n_r': 10 },
+    'n_lamelle': 30,
+    'method': 'Bishop',
+    'prune': False,
+}
+
+RESULT_COLUMNS = [ 'section', 'key', 'status', 'safety', 'center_x', 'center_y', 'radius', 'start_x', 'end_x', 'undrained',
+                   'n_circles', 'n_calculated', 'time', 'file', 'error' ]
+
+LAYER_PARAMS = [ 'gamma', 'a', 'phi', 'cu', 'undrained' ]
+
+
+def read_sections( path, defaults={} ):
+    ''' section dicts from a JSON or CSV file, defaults are used for missing settings '''
+    if path.lower().endswith( '.csv' ):
+        sections = read_csv_sections( path )
+    else:
+        with open( path ) as f:
+            sections = json.load( f )
+        if isinstance( sections, dict ):
+            sections = [ sections ]
+
+    res = []
+    for i, section in enumerate( sections ):
+        section = dict( DEFAULTS, **dict( defaults, **section ) )
+        section.setdefault( 'name', os.path.basename( path ) + ':' + str( i ) )
+        section['file'] = path
+        res.append( section )
+    return res
+
+
+def read_csv_sections( path ):
+    sections = {}
+    with open( path, newline='' ) as f:
+        for row in csv.DictReader( f ):
+            section = sections.setdefault( row['section'], { 'name': row['section'], 'layers': {} } )
+            kind = row['kind'].strip().lower()
+            x, y = float( row['x'] ), float( row['y'] )
+
+            if kind == 'layer':
+                layer = section['layers'].get( row['id'] )
+                if layer is None: # parameters from first point
+                    layer = { 'x': [], 'y': [] }
+                    for key in LAYER_PARAMS:
+                        if row.get( key, '' ).strip():
+                            layer[ key ] = parse_bool( row[ key ] ) if key == 'undrained' else float( row[ key ] )
+                    section['layers'][ row['id'] ] = layer
+                layer['x'].append( x )
+                layer['y'].append( y )
+            elif kind in ( 'gw', 'rock' ):
+                line = section.setdefault( kind, { 'x': [], 'y': [] } )
+                line['x'].append( x )
+                line['y'].append( y )
+            else:
+                raise ValueError( path + ': unknown kind ' + row['kind'] )
+
+    for section in sections.values():
+        section['layers'] = [ section['layers'][i] for i in sorted( section['layers'], key=id_order ) ]
+    return list( sections.values() )
+
+
+def id_order( layer_id ): # numeric ids in numeric order
+    try:
+        return ( 0, float( layer_id ), '' )
+    except ValueError:
+        return ( 1, 0, layer_id )
+
+
+def parse_bool( value ):
+    return str( value ).strip().lower() in ( '1', 'true', 'yes', 'y', 'u' )
+
+
+def section_key( section ):
+    ''' hash of the section definition and of its profile files, changed sections are recalculated on resume '''
+    definition = { key: value for key, value in section.items() if key != 'file' }
+    lines = list( section.get( 'layers', [] ) ) + [ section.get( 'gw' ), section.get( 'rock' ) ]
+    profile_hashes = [ file_hash( line['profile'] ) for line in lines if isinstance( line, dict ) and 'profile' in line ]
+    if profile_hashes: # keys of sections without profiles are unchanged
+        definition['profile_hashes'] = profile_hashes
+    return hashlib.sha256( json.dumps( definition, sort_keys=True ).encode() ).hexdigest()[:16]
+
+
+def file_hash( path ):
+    ''' content hash, None for missing files ( reported when the model is built ) '''
+    if not os.path.exists( path ):
+        return None
+    with open( path, 'rb' ) as f:
+        return hashlib.sha256( f.read() ).hexdigest()
+
+
+def build_model( section ):
+    model = SOIL_MODEL()
+    if 'simple_geom' in section:
+        model.simple_geom( **section['simple_geom'] )
+    for layer in section.get( 'layers', [] ):
+        params = { key: layer[ key ] for key in LAYER_PARAMS if key in layer }
+        if 'profile' in layer:
+            import_profile( model, layer['profile'], layer.get( 'tolerance', 0.05 ), name=layer.get( 'profile_name' ), **params )
+        else:
+            model.add_layer( layer['x'], layer['y'], **dict( { 'gamma': 20, 'a': 0, 'phi': 0, 'cu': 0 }, **params ) )
+    for kind, set_line in ( ( 'gw', model.set_gw ), ( 'rock', model.set_rock ) ):
+        line = section.get( kind )
+        if isinstance( line, dict ) and 'profile' in line:
+            import_profile( model, line['profile'], line.get( 'tolerance', 0.05 ), name=line.get( 'profile_name' ), kind=kind )
+        elif line:
+            set_line( *xy( line ) )
+    if not model.layers:
+        raise ValueError( 'no layers' )
+    return model
+
+
+def xy( line ): # { x, y } or [ x, y ]
+    if isinstance( line, dict ):
+        return line['x'], line['y']
+    return line[0], line[1]
+
+
+def run_section( section, plot_dir=None ):
+    ''' grid search of one section, returns a results row '''
+    res = { 'section': section['name'], 'key': section_key( section ), 'file': section['file'] }
+    t_0 = time.perf_counter()
+    try:
+        if section['search_field'] is None:
+            raise ValueError( 'no search_field' )
+        model = build_model( section )
+        fs = sircular_cylindric_fs( model, n_lamelle=section['n_lamelle'], keep_details=1, method=get_method( section['method'] ) )
+        fs.progress = False
+        report = fs.grid_search( search_field=section['search_field'], increments=section['increments'], prune=section['prune'] )
+
+        res['n_circles'] = report['n_circles']
+        res['n_calculated'] = report['n_calculated']
+        critical = fs.fs_manager.get_critical_fs()
+        if critical is None:
+            res['status'] = 'no_fs'
+        else:
+            res['status'] = 'ok'
+            for key in [ 'safety', 'start_x', 'end_x', 'undrained' ]:
+                res[ key ] = critical[ key ]
+            res['center_x'], res['center_y'], res['radius'] = critical['center_x'], critical['center_y'], critical['radius']
+
+    except Exception as e: # reported per section, the batch continues
+        res['status'] = 'error'
+        res['error'] = type( e ).__name__ + ': ' + str( e )
+    res['time'] = round( time.perf_counter()-t_0, 3 )
+
+    if plot_dir and res['status'] != 'error':
+        try: # figures do not change the analysis status, the section is not recalculated on resume
+            plot_section( model, fs, os.path.join( plot_dir, safe_name( section['name'] ) + '.png' ) )
+        except Exception as e:
+            res['error'] = 'plot: ' + type( e ).__name__ + ': ' + str( e )
+    return res
+
+
+def plot_section( model, fs, file ):
+    import matplotlib
+    matplotlib.use( 'Agg' ) # headless
+    from renderer import MODEL_RENDERER
+    MODEL_RENDERER( model, fs ).render( file=file, show=False )
+
+
+def safe_name( name ):
+    return ''.join( c if c.isalnum() or c in '-_.' else '_' for c in str( name ) )
+
+
+def read_done( path ):
+    ''' keys of sections finished in an earlier run of the results file '''
+    done = set()
+    if os.path.exists( path ):
+        with open( path, newline='' ) as f:
+            for row in csv.DictReader( f ):
+                if row.get( 'status' ) in ( 'ok', 'no_fs' ):
+                    done.add( row['key'] )
+    return done
+
+
+def run_batch( sections, results_file, processes=None, restart=False, plot_dir=None, progress=True ):
+    ''' runs sections not yet in results_file, rows are appended as sections finish. returns the new rows '''
+    if restart and os.path.exists( results_file ):
+        os.remove( results_file )
+    done = read_done( results_file )
+    todo = [ section for section in sections if section_key( section ) not in done ]
+    if plot_dir:
+        os.makedirs( plot_dir, exist_ok=True )
+
+    rows = []
+    new_file = not os.path.exists( results_file )
+    with open( results_file, 'a', newline='' ) as f:
+        writer = csv.DictWriter( f, fieldnames=RESULT_COLUMNS )
+        if new_file:
+            writer.writeheader()
+
+        def save( row ):
+            writer.writerow( row )
+            f.flush() # keep finished sections on interruption
+            rows.append( row )
+
+        bar = tqdm( total=len( todo ), disable=not progress, desc='sections' )
+        if processes == 1:
+            for section in todo:
+                save( run_section( section, plot_dir ) )
+                bar.update( 1 )
+        else:
+            with ProcessPoolExecutor( max_workers=processes ) as pool:
+                futures = [ pool.submit( run_section, section, plot_dir ) for section in todo ]
+                for future in as_completed( futures ):
+                    save( future.result() )
+                    bar.update( 1 )
+        bar.close()
+
+    return rows, len( sections )-len( todo )
+
+
+def main():
+    parser = argparse.ArgumentParser( description='aSlope batch analysis of slope sections' )
+    parser.add_argument( 'files', nargs='+', help='section definitions ( .json or .csv )' )
+    parser.add_argument( '-o', '--output', default='results.csv', help='results file ( CSV ), appended to' )
+    parser.add_argument( '--defaults', help='JSON file with settings for sections that do not give them ( search_field, increments, ... )' )
+    parser.add_argument( '--processes', type=int, default=None, help='worker processes ( default: all cores, 1: no pool )' )
+    parser.add_argument( '--restart', action='store_true', help='discard earlier results and recalculate all sections' )
+    parser.add_argument( '--plot-dir', help='save a figure per section in this folder' )
+    parser.add_argument( '--quiet', action='store_true', help='no progress bar' )
+    args = parser.parse_args()
+
+    defaults = {}
+    if args.defaults:
+        with open( args.defaults ) as f:
+            defaults = json.load( f )
+    sections = [ section for file in args.files for section in read_sections( file, defaults ) ]
+
+    rows, n_skipped = run_batch( sections, args.output, args.processes, args.restart, args.plot_dir, progress=not args.quiet )
+
+    n_failed = sum( row['status'] == 'error' for row in rows )
+    print( '{} sections calculated, {} skipped ( done ), {} failed -> {}'.format( len( rows ), n_skipped, n_failed, args.output ) )
+    for row in rows:
+        if row['status'] == 'error':
+            print( '  ' + row['section'] + ': ' + row['error'] )
+    return 1 if n_failed else 0
+
+
+if __name__=='__main__':
+    sys.exit( main() )
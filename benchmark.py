@@ -0,0 +1,197 @@
+'''
+Benchmarks for the stability pipeline
+
+    python benchmark.py                      # run, check results and compare with benchmark_baseline.json
+    python benchmark.py --update-baseline    # run and store results as new baseline
+
+Each case reports circles/second (best of n_repeat runs) and peak memory (tracemalloc, separate run).
+A case regresses when its rate drops more than --tolerance below the baseline rate.
+The verification examples from main.py (FØ1/FØ2) are checked against their known results, and the
+adaptive/continuous searches against a grid search on a box with degenerate circles left of the toe.
+'''
+
+from model import SOIL_MODEL as M
+from stability import sircular_cylindric_fs as FS
+import tracemalloc
+import argparse
+import json
+import time
+import sys
+import os
+
+BASELINE_FILE = os.path.join( os.path.dirname( os.path.abspath(__file__) ), 'benchmark_baseline.json' )
+
+GW_FO2 = [ [-12.1576,0,2.5,7.5,12.5,17.5,23,28,30.3490,39.5625,70], [0,0,0.2474,0.6829,1.0396,1.3177,1.5331,1.6468,1.6733,1.7433,1.8] ]
+
+BOX = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+
+# verification examples from main.py: [ undrained, GW, circle, F ]
+VERIFICATION = {
+    'FØ1 1a': [ True, None, ( 9.03, 20.09, 25.09 ), 1.063 ],
+    'FØ1 1b': [ True, None, ( 11.57, 10.43, 20.43 ), 1.059 ],
+    'FØ1 critical': [ True, None, ( 10.02, 19.42, 29.42 ), 0.993 ],
+    'FØ2 1a': [ False, GW_FO2, ( 9.03, 20.09, 25.09 ), 1.957 ],
+    'FØ2 1b': [ False, GW_FO2, ( 11.57, 10.43, 20.43 ), 2.499 ],
+    'FØ2 GW at terrain 1a': [ False, [ [-15,0,20,40], [0,0,10,10] ], ( 9.03, 20.09, 25.09 ), 1.228 ],
+    'FØ2 GW at terrain 1b': [ False, [ [-15,0,20,40], [0,0,10,10] ], ( 11.57, 10.43, 20.43 ), 1.773 ],
+    'FØ2b 1a': [ False, GW_FO2, ( 3.12, 24.27, 24.47 ), 1.604 ],
+    'FØ2b 1b': [ False, GW_FO2, ( 6.64, 21.54, 22.54 ), 1.726 ],
+}
+
+
+def simple_model( undrained=True, gw=None, n_layers=1 ):
+    model = M()
+    model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=undrained )
+    if gw:
+        model.set_gw( gw[0], gw[1] )
+    for i in range( 1, n_layers ): # horizontal layers below the slope
+        model.add_layer( [-50,70], [ -i*8/n_layers ]*2, gamma=19+i*0.5, a=5, phi=27, cu=32+10*i, undrained=undrained )
+    return model
+
+
+def single_circles( undrained, gw ):
+    def run():
+        fs = FS( simple_model( undrained, gw ), n_lamelle=30 )
+        fs.progress = False
+        for case in VERIFICATION.values():
+            fs.calc_single_circle( *case[2], clear_FS=False )
+        return len( VERIFICATION )
+    return run
+
+
+def grid( n, undrained=True, gw=None, n_layers=1, prune=False, search_field=BOX ):
+    def run():
+        fs = FS( simple_model( undrained, gw, n_layers ), n_lamelle=30 )
+        fs.progress = False
+        fs.grid_search( search_field=search_field, increments={ 'n_x': n[0], 'n_y': n[1], 'n_r': n[2] }, prune=prune )
+        return n[0]*n[1]*n[2]
+    return run
+
+
+CASES = {
+    'single undrained': single_circles( True, None ),
+    'single drained': single_circles( False, GW_FO2 ),
+    'grid 5x5x5 undrained': grid( (5,5,5) ),
+    'grid 10x10x8 undrained': grid( (10,10,8) ),
+    'grid 20x20x15 undrained': grid( (20,20,15) ),
+    'grid 10x10x8 drained': grid( (10,10,8), undrained=False, gw=GW_FO2 ),
+    'grid 10x10x8 drained 3 layers': grid( (10,10,8), undrained=False, gw=GW_FO2, n_layers=3 ),
+    'grid 10x10x8 undrained 3 layers': grid( (10,10,8), n_layers=3 ),
+    'grid 20x20x15 to rock': grid( (20,20,15), search_field=dict( BOX, lower_tangent=-14 ) ),
+    'grid 20x20x15 to rock pruned': grid( (20,20,15), prune=True, search_field=dict( BOX, lower_tangent=-14 ) ),
+}
+
+
+def check_results( tol=0.0015 ):
+    ''' FØ1/FØ2 verification examples, returns list of failed cases '''
+    failed = []
+    for name, ( undrained, gw, circle, expected ) in VERIFICATION.items():
+        fs = FS( simple_model( undrained, gw ), n_lamelle=30 )
+        fs.calc_single_circle( *circle )
+        F = fs.fs_manager.get_critical_fs()['safety']
+        ok = abs( F-expected ) <= tol
+        print( '{:<28}{:>8.4f}{:>8.3f}  {}'.format( name, F, expected, 'OK' if ok else 'FAILED' ) )
+        if not ok:
+            failed.append( name )
+    return failed
+
+
+# search box with circle centers left of the toe ( negative FS ), searches must not report those
+WIDE_BOX = { 'x_from': -30, 'y_from': 12, 'x_to': 40, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+
+
+def check_searches( tol=0.01 ):
+    ''' critical FS of adaptive_search and minimize_fs within tol of a grid search, returns list of failed searches '''
+    fs = FS( simple_model(), n_lamelle=30 )
+    fs.progress = False
+    fs.grid_search( search_field=WIDE_BOX, increments={ 'n_x': 8, 'n_y': 8, 'n_r': 6 } )
+    expected = fs.fs_manager.get_critical_fs()['safety']
+
+    failed = []
+    for name in [ 'adaptive_search', 'minimize_fs' ]:
+        fs = FS( simple_model(), n_lamelle=30 )
+        fs.progress = False
+        if name == 'adaptive_search':
+            F = fs.adaptive_search( search_field=WIDE_BOX, increments={ 'n_x': 8, 'n_y': 8, 'n_r': 6 } )['fs_min']
+        else:
+            F = fs.minimize_fs( search_field=WIDE_BOX )['fs_min']
+        ok = F is not None and 0 < F <= expected + tol
+        print( '{:<28}{:>8.4f}{:>8.3f}  {}'.format( name, F if F is not None else float( 'nan' ), expected, 'OK' if ok else 'FAILED' ) )
+        if not ok:
+            failed.append( name )
+    return failed
+
+
+def run_case( run, n_repeat=3 ):
+    best = None
+    for _ in range( n_repeat ):
+        t_0 = time.perf_counter()
+        n_circles = run()
+        dt = time.perf_counter() - t_0
+        best = dt if best is None else min( best, dt )
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return { 'circles': n_circles, 'time': best, 'circles_per_s': n_circles/best, 'peak_mb': peak/1e6 }
+
+
+def run_benchmarks( cases=None, n_repeat=3 ):
+    results = {}
+    for name in ( cases or CASES ):
+        results[ name ] = run_case( CASES[ name ], n_repeat )
+    return results
+
+
+def compare( results, baseline, tolerance=0.2 ):
+    ''' prints results vs baseline, returns list of regressed cases '''
+    regressed = []
+    print( '{:<34}{:>9}{:>12}{:>10}{:>10}'.format( 'case', 'circles', 'circles/s', 'peak MB', 'vs base' ) )
+    for name, res in results.items():
+        change = ''
+        if name in baseline:
+            ratio = res['circles_per_s'] / baseline[name]['circles_per_s']
+            change = '{:+.0%}'.format( ratio-1 )
+            if ratio < 1-tolerance:
+                regressed.append( name )
+                change += ' !'
+        print( '{:<34}{:>9}{:>12.0f}{:>10.1f}{:>10}'.format( name, res['circles'], res['circles_per_s'], res['peak_mb'], change ) )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser( description='aSlope benchmarks' )
+    parser.add_argument( '--update-baseline', action='store_true', help='store results as new baseline' )
+    parser.add_argument( '--tolerance', type=float, default=0.2, help='allowed relative drop in circles/s' )
+    parser.add_argument( '--repeat', type=int, default=3, help='runs per case, best is reported' )
+    parser.add_argument( '--case', action='append', choices=list( CASES ), help='run selected case(s) only' )
+    args = parser.parse_args()
+
+    print( 'verification examples' )
+    failed = check_results() + check_searches()
+    print()
+
+    results = run_benchmarks( args.case, args.repeat )
+
+    baseline = {}
+    if os.path.exists( BASELINE_FILE ):
+        with open( BASELINE_FILE ) as f:
+            baseline = json.load( f )
+    regressed = compare( results, baseline, args.tolerance )
+
+    if args.update_baseline:
+        baseline.update( results )
+        with open( BASELINE_FILE, 'w' ) as f:
+            json.dump( baseline, f, indent=4 )
+        print( 'baseline updated: ' + BASELINE_FILE )
+
+    if failed or regressed:
+        print( 'failed: ' + ', '.join( failed + regressed ) )
+        return 1
+    return 0
+
+
+if __name__=='__main__':
+    sys.exit( main() )
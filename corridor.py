@@ -0,0 +1,113 @@
+'''
+sweep along a corridor of consecutive cross-sections ( SOIL_MODELs in order, e.g. by station )
+
+    report = corridor_sweep( models, search_field=box, increments={ 'n_x': 20, 'n_y': 20, 'n_r': 15 } )
+    for section in report['sections']:
+        print( section['station'], section['fs_min'], section['n_evaluated'], section['converged'] )
+
+the first section gets a full grid search. each following section is searched in a box around the critical
+circle of the previous one ( ± window times the extents of search_field, center and tangent depth ) with
+sircular_cylindric_fs.adaptive_search. when the critical circle lies on an inner edge of that box, the box is
+moved to it and widened, after max_expand moves the section gets a full grid search ( fallback ).
+'''
+
+from stability import sircular_cylindric_fs
+import time
+
+
+def corridor_sweep( models, search_field, increments=None, stations=None, window=0.15, local_increments=None, levels=2, n_best=2,
+                    max_expand=2, n_lamelle=30, method=None, workers=None, progress=False ):
+    ''' critical circle per section, search_field: one dict for all sections or a list per section.
+        returns per section reports ( station, critical, fs_min, n_evaluated, boxes, converged, fallback, shift, time )
+        and totals compared with independent full grid searches ( n_full ).
+    '''
+    local_increments = local_increments or { 'n_x': 5, 'n_y': 5, 'n_r': 5 }
+    stations = list( range( len( models ) ) ) if stations is None else stations
+
+    sections = []
+    previous = None # critical circle [ x_center, y_center, radius ] of the last section with a failure surface
+    for i, model in enumerate( models ):
+        t_0 = time.perf_counter()
+        fs = sircular_cylindric_fs( model, n_lamelle=n_lamelle, keep_details=1, method=method )
+        fs.progress = progress
+        field = fs.get_search_field( search_field[i] if isinstance( search_field, ( list, tuple ) ) else search_field )
+        n_x, n_y, n_r = fs.get_increments( increments )
+
+        res = { 'station': stations[i], 'n_evaluated': 0, 'boxes': [], 'converged': False, 'fallback': False }
+        critical = None
+        if previous is not None:
+            half = { key: window*extent for key, extent in field_extents( field ).items() }
+            center = previous
+            for _ in range( max_expand+1 ):
+                box = local_box( field, center, half )
+                search = fs.adaptive_search( box, local_increments, levels=levels, n_best=n_best, workers=workers )
+                res['n_evaluated'] += search['n_evaluated']
+                res['boxes'].append( box )
+                critical = search['critical']
+                if critical is None:
+                    break
+                if not on_inner_edge( critical, box, field ):
+                    res['converged'] = True
+                    break
+                center = critical # follow the minimum, wider box
+                half = { key: 2*value for key, value in half.items() }
+
+        if not res['converged']: # first section, lost track or no failure surface in the box
+            fs.clear_fs()
+            fs.grid_search( field, { 'n_x': n_x, 'n_y': n_y, 'n_r': n_r }, workers=workers )
+            res['n_evaluated'] += n_x*n_y*n_r
+            res['fallback'] = previous is not None
+            fs_crit = fs.fs_manager.get_critical_fs()
+            critical = [ fs_crit['center_x'], fs_crit['center_y'], fs_crit['radius'] ] if fs_crit else None
+            res['converged'] = critical is not None
+
+        res['critical'] = list( critical ) if critical else None
+        res['fs_min'] = float( fs.fs_manager.get_safety( tuple( critical ) ) ) if critical else None
+        res['shift'] = circle_shift( previous, critical )
+        res['time'] = time.perf_counter()-t_0
+        sections.append( res )
+        if critical:
+            previous = critical
+
+    n_full = len( models ) * n_x*n_y*n_r
+    n_evaluated = sum( res['n_evaluated'] for res in sections )
+    return { 'sections': sections, 'n_evaluated': n_evaluated, 'n_full': n_full,
+             'savings': 1 - n_evaluated/n_full if n_full else 0.0, 'n_fallback': sum( res['fallback'] for res in sections ) }
+
+
+def field_extents( field ):
+    return { 'x': field['x_to']-field['x_from'], 'y': field['y_to']-field['y_from'], 't': field['upper_tangent']-field['lower_tangent'] }
+
+
+def local_box( field, circle, half ):
+    ''' search box of ± half around circle ( center, tangent depth ), within field '''
+    x_c, y_c, r = circle
+    t_c = y_c - r
+    return {
+        'x_from': max( field['x_from'], x_c-half['x'] ),
+        'x_to': min( field['x_to'], x_c+half['x'] ),
+        'y_from': max( field['y_from'], y_c-half['y'] ),
+        'y_to': min( field['y_to'], y_c+half['y'] ),
+        'lower_tangent': max( field['lower_tangent'], t_c-half['t'] ),
+        'upper_tangent': min( field['upper_tangent'], t_c+half['t'] )
+    }
+
+
+def on_inner_edge( circle, box, field, rel_tol=1e-9 ):
+    ''' circle on an edge of box that is not an edge of field: the minimum may lie outside the box '''
+    x_c, y_c, r = circle
+    values = { 'x': x_c, 'y': y_c, 't': y_c-r }
+    edges = [ ( 'x', 'x_from' ), ( 'x', 'x_to' ), ( 'y', 'y_from' ), ( 'y', 'y_to' ), ( 't', 'lower_tangent' ), ( 't', 'upper_tangent' ) ]
+    extents = field_extents( field )
+    for key, edge in edges:
+        tol = rel_tol * max( extents[ key ], 1 )
+        if abs( values[ key ]-box[ edge ] ) <= tol and abs( box[ edge ]-field[ edge ] ) > tol:
+            return True
+    return False
+
+
+def circle_shift( previous, critical ):
+    ''' change of center and tangent depth from the previous section '''
+    if previous is None or critical is None:
+        return None
+    return { 'x': critical[0]-previous[0], 'y': critical[1]-previous[1], 't': ( critical[1]-critical[2] )-( previous[1]-previous[2] ) }
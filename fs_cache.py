@@ -0,0 +1,114 @@
+'''
+persistent FS results per circle ( SQLite ), shared between sessions
+
+    cache = FS_CACHE( 'fs_cache.sqlite', max_rows=1000000 )
+    fs = sircular_cylindric_fs( model, cache=cache )
+
+results are keyed by an analysis hash ( model content, n_lamelle, method settings, see
+sircular_cylindric_fs.analysis_key ) and the circle. circles without failure surface are cached too.
+when max_rows is exceeded the least recently used rows are evicted.
+'''
+
+import sqlite3
+import time
+import numpy as np
+
+
+class FS_CACHE():
+    version = 1 # part of the analysis key, increase when calculation results change
+
+    def __init__( self, path, max_rows=1000000 ):
+        self.path = path
+        self.max_rows = max_rows # 0: no limit
+        self.hits = 0
+        self.misses = 0
+
+        self.db = sqlite3.connect( path )
+        self.db.execute( '''CREATE TABLE IF NOT EXISTS fs ( analysis TEXT, cx REAL, cy REAL, r REAL, has_fs INTEGER, safety REAL,
+            start_x REAL, end_x REAL, undrained INTEGER, x BLOB, y BLOB, last_used REAL, PRIMARY KEY ( analysis, cx, cy, r ) )''' )
+        self.db.execute( 'CREATE INDEX IF NOT EXISTS fs_last_used ON fs ( last_used )' )
+        self.db.execute( 'CREATE TEMP TABLE query ( i INTEGER, cx REAL, cy REAL, r REAL )' )
+        self.db.commit()
+
+
+    def get( self, analysis, calc_list ):
+        ''' cached results of calc_list circles: { index in calc_list: fs dict, or None for circles without failure surface } '''
+        self.db.execute( 'DELETE FROM query' )
+        self.db.executemany( 'INSERT INTO query VALUES ( ?, ?, ?, ? )', [ ( i, *circle ) for i, circle in enumerate( calc_list ) ] )
+        rows = self.db.execute( '''SELECT q.i, f.has_fs, f.safety, f.start_x, f.end_x, f.undrained, f.x, f.y FROM query q
+            JOIN fs f ON f.analysis=? AND f.cx=q.cx AND f.cy=q.cy AND f.r=q.r''', ( analysis, ) ).fetchall()
+
+        found = {}
+        for i, has_fs, safety, start_x, end_x, undrained, x, y in rows:
+            if not has_fs:
+                found[i] = None
+                continue
+            x_cen, y_cen, radius = calc_list[i]
+            found[i] = {
+                "center_x": x_cen,
+                "center_y": y_cen,
+                "radius": radius,
+                "start_x": start_x,
+                "end_x": end_x,
+                "x": np.frombuffer( x ).tolist(),
+                "y": np.frombuffer( y ).tolist(),
+                "safety": np.nan if safety is None else safety, # NaN is stored as NULL
+                "iterations": None,
+                "undrained": bool( undrained ),
+                "slices": None,
+                "lamellas": None
+            }
+
+        self.db.executemany( 'UPDATE fs SET last_used=? WHERE analysis=? AND cx=? AND cy=? AND r=?',
+                             [ ( time.time(), analysis, *calc_list[i] ) for i in found ] )
+        self.db.commit()
+
+        self.hits += len( found )
+        self.misses += len( calc_list ) - len( found )
+        return found
+
+
+    def put( self, analysis, fs_list, no_fs=[] ):
+        ''' stores fs dicts ( with coordinates ) and circles [ x_cen, y_cen, r ] without failure surface '''
+        now = time.time()
+        rows = [ ( analysis, fs['center_x'], fs['center_y'], fs['radius'], 1, fs['safety'], fs['start_x'], fs['end_x'], int( bool( fs['undrained'] ) ),
+                   np.asarray( fs['x'], dtype=float ).tobytes(), np.asarray( fs['y'], dtype=float ).tobytes(), now ) for fs in fs_list ]
+        rows += [ ( analysis, *circle, 0, None, None, None, 0, None, None, now ) for circle in no_fs ]
+        self.db.executemany( 'INSERT OR REPLACE INTO fs VALUES ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )', rows )
+        self.evict()
+        self.db.commit()
+
+
+    def evict( self ):
+        if not self.max_rows:
+            return
+        n_excess = self.n_rows() - self.max_rows
+        if n_excess > 0: # least recently used first
+            self.db.execute( 'DELETE FROM fs WHERE rowid IN ( SELECT rowid FROM fs ORDER BY last_used LIMIT ? )', ( n_excess, ) )
+
+
+    def n_rows( self ):
+        return self.db.execute( 'SELECT COUNT(*) FROM fs' ).fetchone()[0]
+
+
+    def clear( self ):
+        self.db.execute( 'DELETE FROM fs' )
+        self.db.commit()
+        self.reset_stats()
+
+
+    def reset_stats( self ):
+        self.hits = 0
+        self.misses = 0
+
+
+    def get_stats( self ):
+        n = self.hits + self.misses
+        page_count = self.db.execute( 'PRAGMA page_count' ).fetchone()[0]
+        page_size = self.db.execute( 'PRAGMA page_size' ).fetchone()[0]
+        return { 'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits/n if n else 0.0,
+                 'rows': self.n_rows(), 'size_bytes': page_count*page_size }
+
+
+    def close( self ):
+        self.db.close()
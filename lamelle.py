@@ -15,6 +15,7 @@ note vertical boundaries (x1==x4 && x2==x3)
 """
 
 from numpy import cos, arctan, pi, tan
+import numpy as np
 
 class lamellas():
     def __init__( self, model_ref):
@@ -43,8 +44,11 @@ class lamellas():
             self.y3 = y3
             self.dx = x3-x4
 
-            self.y1 = self.model.layers[0].y_from_x( x4 ) # top from terrain
-            self.y2 = self.model.layers[0].y_from_x( x3 )
+            self.columns_4 = self.model.get_columns( x4 )[:, 0] # layer tops & GW at edges
+            self.columns_3 = self.model.get_columns( x3 )[:, 0]
+
+            self.y1 = self.columns_4[0] # top from terrain
+            self.y2 = self.columns_3[0]
 
             self.x_cen = ( x3 + x4 ) / 2
             self.y_cen = ( y3 + y4 ) / 2
@@ -70,7 +74,7 @@ class lamellas():
 
         def calc_pp( self ):
             if self.model.GW: # calculate PP if GW present
-                h_GW = self.model.GW.y_from_x( self.x_cen )
+                h_GW = self.model.get_columns( self.x_cen )[-1, 0]
                 h_w = ( h_GW-self.y_cen )
 
                 if h_w >= 0:
@@ -134,15 +138,15 @@ class lamellas():
             bottom_i = self.model.get_layer_index_by_xy( self.x_cen, self.y_cen )
 
             for i in range( bottom_i+1 ):
-                y1 = self.model.layers[i].y_from_x( self.x1_4 )
-                y2 = self.model.layers[i].y_from_x( self.x2_3 )
+                y1 = self.columns_4[i]
+                y2 = self.columns_3[i]
 
                 if i == bottom_i:
                     y3 = self.y3
                     y4 = self.y4
                 else:
-                    y3 = self.model.layers[i+1].y_from_x( self.x2_3 )
-                    y4 = self.model.layers[i+1].y_from_x( self.x1_4 )
+                    y3 = self.columns_3[i+1]
+                    y4 = self.columns_4[i+1]
 
                 self.soils.append( lamellas.soil_volume( self.model, i, self.x1_4, y1, self.x2_3, y2, self.x2_3, y3, self.x1_4, y4) )
 
@@ -187,4 +191,231 @@ class lamellas():
                 third_sum += ( (y[i]+y[i+1]) * (x[i]*y[i+1] - x[i+1]*y[i]) )
             y_m_cen = -1/( 6*area ) * third_sum
 
-            return [area, x_m_cen, y_m_cen]
\ No newline at end of file
+            return [area, x_m_cen, y_m_cen]
+
+class lamella_arrays():
+    ''' array backed lamellas for one or a batch of failure surfaces
+
+        slices of all surfaces are concatenated, surface j owns slices offsets[j]:offsets[j+1].
+        per slice arrays carry the same names as the lamelle attributes, per layer/slice
+        arrays (soil volumes) have shape ( n_layers, n_slices ).
+    '''
+    geometry_keys = ( 'x1_4', 'x2_3', 'y1', 'y2', 'y3', 'y4', 'dx', 'x_cen', 'y_cen', 'tan_alpha', 'alpha', 'cos_alpha', 'delta_L',
+                      'bottom_index' )
+    slice_keys = geometry_keys + ( 'h_GW', 'area', 'weight', 'x_m_cen', 'y_m_cen', 'u', 'gamma', 'undrained', 'a', 'phi', 'phi_rad',
+                                   'tan_phi', 'cu', 'p', 'p_prime', 'T' )
+    layer_keys = ( 'gamma', 'a', 'phi', 'cu' ) # layer parameters used by calc_soils
+    soil_keys = ( 'tops_left', 'tops_right', 'soil_active', 'soil_area', 'soil_x_cen', 'soil_y_cen' )
+
+    def __init__( self, model_ref, x_lists, y_lists ):
+        self.model = model_ref
+
+        n_slices = [ len(x)-1 for x in x_lists ]
+        self.offsets = np.concatenate( ( [0], np.cumsum(n_slices, dtype=int) ) ).astype( int )
+        self.surface_index = np.repeat( np.arange( len(n_slices) ), n_slices )
+
+        # slice edges as node indices, surface j has nodes offsets[j]+j .. offsets[j+1]+j
+        self.x_nodes = self.concat( x_lists )
+        self.left_node = np.arange( self.offsets[-1] ) + self.surface_index
+        self.right_node = self.left_node + 1
+
+        self.y_nodes = self.concat( y_lists )
+        self.x1_4 = self.x_nodes[ self.left_node ] # x4
+        self.x2_3 = self.x_nodes[ self.right_node ] # x3
+        self.y4 = self.y_nodes[ self.left_node ]
+        self.y3 = self.y_nodes[ self.right_node ]
+
+        self.calc_geometry()
+        self.calc_soils()
+
+
+    def concat( self, lists ):
+        if not lists:
+            return np.zeros( 0 )
+        return np.concatenate( [ np.asarray(l, dtype=float) for l in lists ] )
+
+
+    def calc_geometry( self ):
+        x3, x4, y3, y4 = self.x2_3, self.x1_4, self.y3, self.y4
+
+        self.dx = x3-x4
+        self.x_cen = ( x3 + x4 ) / 2
+        self.y_cen = ( y3 + y4 ) / 2
+
+        self.tan_alpha = (y3-y4) / (x3-x4)
+        self.alpha = np.arctan( self.tan_alpha )
+        self.cos_alpha = np.cos( self.alpha )
+        self.delta_L = (x3-x4) / self.cos_alpha
+
+        # layer tops at slice edges ( n_layers, n_slices ), terrain on top. shared edges are looked up once
+        layers = self.model.layers
+        cached = self.model.column_cache.batch_lookups
+        tops_nodes = self.model.get_columns( self.x_nodes, cached=cached )[ :-1 ]
+        self.tops_left = tops_nodes[ :, self.left_node ]
+        self.tops_right = tops_nodes[ :, self.right_node ]
+        self.y1 = self.tops_left[0]
+        self.y2 = self.tops_right[0]
+
+        # bottom soil: last layer with its top above the slice base center
+        columns_cen = self.model.get_columns( self.x_cen, cached=cached )
+        self.bottom_index = self.model.get_layer_index_by_xy( self.x_cen, self.y_cen, tops=columns_cen[ :-1 ] ).reshape( -1 )
+
+        # soil volumes, each bounded by its layer top and the next layer top (or the slice base)
+        layer_i = np.arange( len(layers) )[:, None]
+        is_bottom = layer_i == self.bottom_index
+        bot_left = np.where( is_bottom, y4, np.vstack( (self.tops_left[1:], y4[None]) ) )
+        bot_right = np.where( is_bottom, y3, np.vstack( (self.tops_right[1:], y3[None]) ) )
+
+        self.soil_active = layer_i <= self.bottom_index
+        self.soil_area, self.soil_x_cen, self.soil_y_cen = self.calc_mass_centers(
+            [ x4, x3, x3, x4 ], [ self.tops_left, self.tops_right, bot_right, bot_left ] )
+
+
+    def calc_mass_centers( self, x, y ):
+        ''' vectorized soil_volume.calc_mass_center, inactive volumes are zeroed '''
+        x = [ np.broadcast_to( xi, self.soil_active.shape ) for xi in x + [ x[0] ] ] # closed polygon
+        y = y + [ y[0] ]
+
+        first_sum = 0
+        second_sum = 0
+        third_sum = 0
+        for i in range( len(x)-1 ):
+            cross = x[i]*y[i+1] - x[i+1]*y[i]
+            first_sum += cross
+            second_sum += (x[i]+x[i+1]) * cross
+            third_sum += (y[i]+y[i+1]) * cross
+        area = -first_sum / 2
+
+        with np.errstate( divide='ignore', invalid='ignore' ): # inactive volumes may be degenerate
+            x_m_cen = -1/( 6*area ) * second_sum
+            y_m_cen = -1/( 6*area ) * third_sum
+
+        active = self.soil_active
+        return np.where( active, area, 0 ), np.where( active, x_m_cen, 0 ), np.where( active, y_m_cen, 0 )
+
+
+    def calc_soils( self, params=None, h_GW=None ):
+        ''' weights, pore pressures and base strengths from current layer parameters and GW, geometry is not recalculated.
+            params optionally replaces the layer parameters ( layer_keys ) by ( n_layers, ) or per slice ( n_layers, n_slices ) arrays,
+            h_GW optionally replaces the GW level at the slice centers.
+        '''
+        layers = self.model.layers
+        if params is None:
+            params = { key: np.array( [ getattr( layer, key ) for layer in layers ], dtype=float ) for key in self.layer_keys }
+        l_gamma = np.reshape( params['gamma'], ( len(layers), -1 ) )
+
+        soil_weight = l_gamma * self.soil_area
+        self.area = self.soil_area.sum( axis=0 )
+        self.weight = soil_weight.sum( axis=0 )
+        self.x_m_cen = ( self.soil_x_cen * soil_weight ).sum( axis=0 ) / self.weight
+        self.y_m_cen = ( self.soil_y_cen * soil_weight ).sum( axis=0 ) / self.weight
+
+        self.u = self.calc_pp( h_GW )
+
+        # strength params from base soil
+        self.gamma = self.base_values( l_gamma )
+        self.undrained = np.array( [ layer.undrained for layer in layers ], dtype=bool )[ self.bottom_index ]
+        self.a = self.base_values( params['a'] )
+        self.phi = self.base_values( params['phi'] )
+        self.phi_rad = pi * self.phi / 180
+        self.tan_phi = np.tan( self.phi_rad )
+        self.cu = self.base_values( params['cu'] )
+
+        self.p = self.weight / self.dx
+        self.p_prime = self.p - self.u
+
+        self.T = ( self.p_prime+self.a ) * self.tan_phi * self.dx
+
+
+    def base_values( self, values ):
+        ''' layer values ( n_layers, ) or ( n_layers, n_slices ) at the base soil of each slice '''
+        values = np.reshape( values, ( len(self.model.layers), -1 ) )
+        return values[ self.bottom_index, np.arange( len(self.bottom_index) ) % values.shape[1] ]
+
+
+    def calc_pp( self, h_GW=None ):
+        if h_GW is not None or self.model.GW: # calculate PP if GW present
+            self.h_GW = self.model.GW.y_from_x( self.x_cen ) if h_GW is None else h_GW
+            h_w = ( self.h_GW-self.y_cen )
+            return np.where( h_w >= 0, h_w * self.model.GW.gamma, 0 )
+        self.h_GW = np.full( len(self.x_cen), np.nan )
+        return np.zeros( len(self.x_cen) )
+
+
+    def realizations( self, params, gw_shift=None ):
+        ''' all surfaces repeated for n realizations of the layer parameters, surface j of realization r is surface r*n_surfaces+j.
+            params: ( n_layers, n ) arrays per layer_keys, gw_shift: ( n, ) vertical shifts of the GW level ( needs model.GW )
+        '''
+        n = np.shape( params['gamma'] )[1]
+        n_slices = len( self.x_cen )
+
+        real = lamella_arrays.__new__( lamella_arrays )
+        real.model = self.model
+        real.offsets = np.append( ( np.arange( n )[:, None]*n_slices + self.offsets[:-1] ).reshape( -1 ), n*n_slices )
+        real.surface_index = ( np.arange( n )[:, None]*self.n_surfaces() + self.surface_index ).reshape( -1 )
+        real.x_nodes = np.tile( self.x_nodes, n )
+        real.y_nodes = np.tile( self.y_nodes, n )
+        real.left_node = np.arange( n*n_slices ) + real.surface_index
+        real.right_node = real.left_node + 1
+        for key in lamella_arrays.geometry_keys:
+            setattr( real, key, np.tile( getattr( self, key ), n ) )
+        for key in lamella_arrays.soil_keys:
+            setattr( real, key, np.tile( getattr( self, key ), ( 1, n ) ) )
+
+        h_GW = None
+        if gw_shift is not None:
+            h_GW = np.tile( self.model.GW.y_from_x( self.x_cen ), n ) + np.repeat( gw_shift, n_slices )
+        real.calc_soils( { key: np.repeat( params[key], n_slices, axis=1 ) for key in self.layer_keys }, h_GW )
+        return real
+
+
+    def get_shear_force( self, F, sel=slice(None) ):
+        ''' shear force per slice for F ( number or per slice ), optionally for selected slices only '''
+        with np.errstate( divide='ignore', invalid='ignore' ): # drained expression not used for undrained slices
+            m_alpha = ( 1+1/F * self.tan_phi[sel] * self.tan_alpha[sel] ) * self.cos_alpha[sel]
+            return np.where( self.undrained[sel], self.cu[sel] * self.delta_L[sel], self.T[sel]/m_alpha )
+
+
+    def surface_sum( self, values ):
+        if len( values ) == 0:
+            return np.zeros( self.n_surfaces() )
+        return np.add.reduceat( values, self.offsets[:-1] )
+
+
+    def surface_undrained( self ):
+        return self.surface_sum( self.undrained.astype(int) ) > 0
+
+
+    def n_surfaces( self ):
+        return len( self.offsets ) - 1
+
+
+    def get_surface( self, j ):
+        ''' view of failure surface j as its own lamella_arrays '''
+        i_from, i_to = self.offsets[j], self.offsets[j+1]
+        surface = lamella_arrays.__new__( lamella_arrays )
+        surface.model = self.model
+        surface.offsets = np.array( [ 0, i_to-i_from ] )
+        surface.surface_index = np.zeros( i_to-i_from, dtype=int )
+        surface.x_nodes = self.x_nodes[ i_from+j:i_to+j+1 ]
+        surface.y_nodes = self.y_nodes[ i_from+j:i_to+j+1 ]
+        surface.left_node = self.left_node[ i_from:i_to ] - ( i_from+j )
+        surface.right_node = surface.left_node + 1
+        for key in lamella_arrays.slice_keys:
+            setattr( surface, key, getattr( self, key )[ i_from:i_to ] )
+        for key in lamella_arrays.soil_keys:
+            setattr( surface, key, getattr( self, key )[ :, i_from:i_to ] )
+        return surface
+
+
+    def array_keys( self ):
+        return ( 'offsets', 'surface_index', 'x_nodes', 'y_nodes', 'left_node', 'right_node' ) + self.slice_keys + self.soil_keys
+
+
+    def detach( self ):
+        ''' copies arrays that are views ( get_surface ), so the parent batch can be freed '''
+        for key in self.array_keys():
+            values = getattr( self, key )
+            if values.base is not None:
+                setattr( self, key, values.copy() )
+        return self
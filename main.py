@@ -2,9 +2,9 @@
 Possible TODO-s
     # DONE - redo plotting procedure for heatmap (search zone),
         DONE - 1. take known points & use kriging/RBF to fill in unknown areas
-    # separate failure surface calculations (geometry) and factor of safety calculations (geotechnics)
-    # fix bug for listing x_breakpoints when n_layers > 1
-    # implement calculation method as separate classes ('OMS', 'Bishop', 'Janbu', ...)
+    # DONE - separate failure surface calculations (geometry) and factor of safety calculations (geotechnics) - lamella_arrays.calc_soils
+    # DONE - fix bug for listing x_breakpoints when n_layers > 1
+    # DONE - implement calculation method as separate classes ('OMS', 'Bishop', 'Janbu', ...) - methods.py
     # implement terrain loads
     # implent varying Su with depth
     # implement ADP
@@ -12,7 +12,7 @@ Possible TODO-s
     # fix issues regarding inclomplete models (extend layers to boundaries)
     # fix geometric issue when circle center is below top of slope
 
-    # automate search for critical fs:
+    # DONE - automate search for critical fs (sircular_cylindric_fs.adaptive_search):
       1. grid calculations (very coarse - overview )
       2. upscale w. meshgrid & kriging
       3. select cutoff FS for detecting lowest FS
@@ -28,6 +28,8 @@ Possible TODO-s
 from model import SOIL_MODEL as M
 from renderer import MODEL_RENDERER as R
 from stability import sircular_cylindric_fs as FS
+from methods import oms, bishop, janbu
+from probabilistic import normal, lognormal, uniform
 
 
 def main():
@@ -76,11 +78,116 @@ def main():
         fs.calc_single_circle( 3.12, 24.27, 24.47 ) # 1a: 1.604/1.604 - OK
         fs.calc_single_circle( 6.64, 21.54, 22.54, clear_FS=False ) # 1b: 1.727/1.726 - OK
 
+    # adaptive search: coarse grid, then finer grids around the best circles
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        inc = { 'n_x': 6, 'n_y': 6, 'n_r': 5 }
+
+        report = fs.adaptive_search( search_field=box, increments=inc, levels=4 )
+        print( 'circles evaluated: ' + str(report['n_evaluated']) + ' (dense grid: ' + str(report['n_dense']) + ')' )
+
+    # continuous search: Nelder-Mead over center and tangent depth from the best circles of a coarse grid
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+
+        result = fs.minimize_fs( search_field=box, n_seeds=3 )
+        print( 'critical circle: ' + str(result['critical']) + ', F=' + str(round(result['fs_min'],3)) )
+
+    # compare calculation methods on one geometry pass
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=False )
+        model.set_gw( [-12.1576,0,2.5,7.5,12.5,17.5,23,28,30.3490,39.5625,70],[0,0,0.2474,0.6829,1.0396,1.3177,1.5331,1.6468,1.6733,1.7433,1.8] )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        inc = { 'n_x': 20, 'n_y': 20, 'n_r': 15 }
+
+        comparison = fs.compare_methods( [ oms(), bishop(), janbu() ], search_field=box, increments=inc )
+        for name, res in comparison['methods'].items():
+            print( name + ': F=' + str(round(res['fs_min'],3)) + ', ' + str(int(res['surfaces_per_s'])) + ' surfaces/s' )
+
+    # parameter sweep: circle geometry from one grid search reused for each cu
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        inc = { 'n_x': 20, 'n_y': 20, 'n_r': 15 }
+
+        fs.cache_geometry = True
+        fs.grid_search( search_field=box, increments=inc )
+        for cu in [ 24, 28, 32, 36 ]:
+            model.layers[0].cu = cu
+            fs.recalc_fs()
+            print( 'cu=' + str(cu) + ': F=' + str(round(fs.fs_manager.get_critical_fs()['safety'],3)) )
+
+    # probabilistic FS: realizations of soil parameters and GW level on the critical circle of a grid search
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=False )
+        model.set_gw( [-12.1576,0,2.5,7.5,12.5,17.5,23,28,30.3490,39.5625,70],[0,0,0.2474,0.6829,1.0396,1.3177,1.5331,1.6468,1.6733,1.7433,1.8] )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        fs.grid_search( search_field=box, increments={ 'n_x': 10, 'n_y': 10, 'n_r': 8 } )
+
+        distributions = { 0: { 'phi': normal( 29, 2 ), 'a': lognormal( 10, 3 ), 'gamma': normal( 19, 0.5 ) } }
+        result = fs.monte_carlo( distributions, n=10000, gw_shift=uniform( -0.5, 1.0 ), seed=1 )
+        print( 'F mean=' + str(round(result['mean'],3)) + ', beta=' + str(round(result['beta'],2)) + ', P(F<1)=' + str(result['pf']) )
+
+    # streaming grid search: results as they are calculated, stop at the first circle with F < 1.0
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+
+        stream = fs.iter_grid_search( search_field=box, increments={ 'n_x': 100, 'n_y': 100, 'n_r': 50 }, top_k=5, stop_below=1.0 )
+        for circle, F in stream:
+            pass
+        print( str(stream.n_evaluated) + '/' + str(stream.n_total) + ' circles, stopped: ' + str(stream.stopped) + ', best: ' + str(stream.top()[:1]) )
+
+    # design iteration: after model edits only circles reaching into changed regions are recalculated
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=False )
+        model.set_gw( [-50,0,20,70],[0,0,1,1] )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        inc = { 'n_x': 20, 'n_y': 20, 'n_r': 15 }
+        fs.grid_search( search_field=box, increments=inc )
+
+        model.add_layer( [-50,70], [-6,-6], gamma=19, a=5, phi=27, cu=40, undrained=False )
+        report = fs.grid_search( search_field=box, increments=inc, incremental=True )
+        print( str(report['n_calculated']) + ' circles recalculated, ' + str(report['n_reused']) + ' reused' )
+
+    # profiling: time per calculation stage, iterations and circle counts
+    elif False:
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=False )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        fs.profile = True
+        fs.grid_search( search_field=box, increments={ 'n_x': 20, 'n_y': 20, 'n_r': 15 }, prune=True )
+        print( fs.stats )
+        fs.stats.write_json( 'fs_stats.json', case='simple slope 20x20x15' )
+
+    # corridor: consecutive sections searched around the critical circle of the previous section
+    elif False:
+        from corridor import corridor_sweep
+        models = []
+        for i in range( 10 ): # slope getting steeper along the road
+            section = M()
+            section.simple_geom( H=10+0.3*i, L=20-0.4*i, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+            models.append( section )
+        box = { 'x_from': -1, 'y_from': 11, 'x_to': 21, 'y_to': 36, 'upper_tangent': -0.5, 'lower_tangent': -10 }
+        report = corridor_sweep( models, search_field=box, increments={ 'n_x': 20, 'n_y': 20, 'n_r': 15 }, stations=[ 1200+20*i for i in range( 10 ) ] )
+        for res in report['sections']:
+            print( res['station'], round( res['fs_min'], 3 ), res['n_evaluated'], 'converged' if res['converged'] else '', 'fallback' if res['fallback'] else '' )
+        print( str(report['n_evaluated']) + ' of ' + str(report['n_full']) + ' circles ( full grid searches )' )
+
+    # non-circular surfaces: random polylines refined by a random walk, composite along the rock surface ( Janbu )
+    elif False:
+        from noncircular import polyline_fs
+        model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
+        search = polyline_fs( model, n_lamelle=30, n_ctrl=3, floor='rock' )
+        report = search.search( entry=( -8, 2 ), exit=( 18, 40 ), n_random=5000, seed=1 )
+        print( 'F=' + str(round(report['fs_min'],3)) + ', ' + str(report['n_evaluated']) + ' surfaces, ' + str(int(report['surfaces_per_s'])) + ' surfaces/s' )
+
     # grid search
     elif True:
         model.simple_geom( H=10, L=20, D_ROCK=10, gamma=19, a=10, phi=29, cu=32, undrained=True )
         model.set_gw( [-50,-12.1576,0,2.5,7.5,12.5,17.5,23,28,30.3490,39.5625,70],[0,0,0,0.2474,0.6829,1.0396,1.3177,1.5331,1.6468,1.6733,1.7433,1.8] )
-        #model.add_layer( [-50,70], [-4,-4], gamma=19, a=10, phi=29, cu=32, undrained=False ) # fails
+        #model.add_layer( [-50,70], [-4,-4], gamma=19, a=10, phi=29, cu=32, undrained=False )
 
         box = { # box, and lowest point bounds
             'x_from': -1,
@@ -0,0 +1,115 @@
+'''
+limit equilibrium methods working on slice arrays ( lamella_arrays of one or more failure surfaces )
+
+    F, iterations = method.calc_fs( slices, center_x, radius )
+
+center_x and radius are given per failure surface, they are only used by the
+moment equilibrium methods ( OMS, Bishop ). Janbu (simplified) uses force equilibrium.
+
+sign convention as in lamelle: alpha from base inclination ( y3-y4 )/( x3-x4 ),
+driving terms W*x_t and W*tan(alpha) positive for the slope rising to the right.
+'''
+
+import numpy as np
+
+
+class lem_method():
+    name = None
+    moment_equilibrium = True # needs circle center/radius
+
+    def __init__( self, eps=0.0001, max_it=100 ):
+        self.eps = eps
+        self.max_it = max_it
+
+
+    def calc_fs( self, slices, center_x=None, radius=None ):
+        raise NotImplementedError
+
+
+    def surface_sum( self, slices, values, sel=None ):
+        ''' sums per failure surface ( in slice order ), optionally of selected slices only '''
+        s_i = slices.surface_index if sel is None else slices.surface_index[ sel ]
+        return np.bincount( s_i, values, minlength=slices.n_surfaces() )
+
+
+    def moment_arm( self, slices, center_x ): # W * x_t per slice
+        center_x = np.asarray( center_x, dtype=float )
+        return slices.weight * ( slices.x_m_cen-center_x[ slices.surface_index ] )
+
+
+    def iterate( self, slices, driving, resisting ):
+        ''' fixed point F_k+1 = resisting( F_k, sel ) / driving for all surfaces, converged surfaces are masked out.
+            resisting( F, sel ) returns sums per surface using the slices selected by sel.
+        '''
+        n = slices.n_surfaces()
+        F_k = np.ones( n ) # iterate this one
+        F_temp = np.zeros( n )
+        k = np.zeros( n, dtype=int )
+        active = np.ones( n, dtype=bool )
+
+        while active.any():
+            F_temp[ active ] = F_k[ active ] # last iteration
+            sel = active[ slices.surface_index ] # slices of unconverged surfaces
+
+            with np.errstate( divide='ignore', invalid='ignore' ):
+                F_k[ active ] = ( resisting( F_k[ slices.surface_index[sel] ], sel ) / driving )[ active ]
+                k[ active ] += 1
+                active &= ( np.abs( F_k-F_temp ) > self.eps ) & ( k <= self.max_it ) # inf-inf: NaN, stops
+
+        return F_k, k
+
+
+
+class oms( lem_method ):
+    ''' ordinary method of slices ( Fellenius ): base normal stress p*cos^2(alpha) - u, no iteration '''
+    name = 'OMS'
+
+    def calc_fs( self, slices, center_x=None, radius=None ):
+        sum_Q_e = 0 # no implemented
+        sum_Wi_x_ti = self.surface_sum( slices, self.moment_arm( slices, center_x ) )
+
+        sigma_prime = slices.p * slices.cos_alpha**2 - slices.u
+        T = np.where( slices.undrained, slices.cu, ( sigma_prime+slices.a ) * slices.tan_phi ) * slices.delta_L
+
+        with np.errstate( divide='ignore', invalid='ignore' ):
+            F = np.asarray( radius, dtype=float ) * self.surface_sum( slices, T ) / ( sum_Q_e + sum_Wi_x_ti )
+        return F, np.ones( len(F), dtype=int )
+
+
+
+class bishop( lem_method ):
+    ''' simplified Bishop, undrained slices with cu*delta_L ( converged after 2 iterations ) '''
+    name = 'Bishop'
+
+    def calc_fs( self, slices, center_x=None, radius=None ):
+        sum_Q_e = 0 # no implemented
+        sum_Wi_x_ti = self.surface_sum( slices, self.moment_arm( slices, center_x ) ) # also called p*delta_x*x_t, independent of F
+        radius = np.asarray( radius, dtype=float )
+
+        def resisting( F, sel ):
+            return radius * self.surface_sum( slices, slices.get_shear_force( F, sel ), sel )
+
+        return self.iterate( slices, sum_Q_e + sum_Wi_x_ti, resisting )
+
+
+
+class janbu( lem_method ):
+    ''' simplified Janbu ( force equilibrium, no correction factor f0 ), valid for non-circular surfaces '''
+    name = 'Janbu'
+    moment_equilibrium = False
+
+    def calc_fs( self, slices, center_x=None, radius=None ):
+        sum_Q_e = 0 # no implemented
+        sum_W_tan = self.surface_sum( slices, slices.weight * slices.tan_alpha )
+
+        def resisting( F, sel ): # shear force along base, horizontal component
+            return self.surface_sum( slices, slices.get_shear_force( F, sel ) / slices.cos_alpha[ sel ], sel )
+
+        return self.iterate( slices, sum_Q_e + sum_W_tan, resisting )
+
+
+
+METHODS = { method.name: method for method in [ oms, bishop, janbu ] }
+
+def get_method( name, **kwargs ):
+    return METHODS[ name ]( **kwargs )
@@ -1,3 +1,8 @@
+from collections import OrderedDict
+import numpy as np
+import hashlib
+
+
 class SOIL_MODEL():
     def __init__( self ):
         ''' creates a single layer geometry '''
@@ -13,6 +18,11 @@ class SOIL_MODEL():
         self.layer_color_max_index = 10  # 10: 0-9
         self.layer_color_index = 0
 
+        self.column_cache = SOIL_MODEL.COLUMN_CACHE() # layer tops & GW level per x
+        self.geometry_version = 0 # increased when layer geometry changes
+        self.version = 0 # increased on every change of layers, GW or rock
+        self.changes = [] # [ version, x_from, x_to, y_max ] per change, see changed_region
+
 
     def simple_geom( self, H, L, D_ROCK, gamma=20, a=0, phi=30, cu=0, undrained=True ):
         ''' creates a simple slope and flat bedrock '''
@@ -24,7 +34,10 @@ class SOIL_MODEL():
 
 
     def set_gw( self, x_list, y_list ):
+        old = self.GW
         self.GW = SOIL_MODEL.LAYER( x_list, y_list, gamma=10, cu=0 )
+        self.column_cache.clear()
+        self.record_change( self.GW, self.changed_region( old, self.GW ) )
 
 
     def add_layer( self, x, y, gamma, a, phi, cu, undrained=True ):
@@ -33,16 +46,91 @@ class SOIL_MODEL():
 
         self.layers.append( SOIL_MODEL.LAYER( x, y, gamma, a, phi, cu, undrained=undrained, color_index=c_i ) )
         self.check_bounds( x, y )
+        self.column_cache.clear()
+        self.geometry_version += 1
+        self.record_change( self.layers[-1], self.changed_region( None, self.layers[-1] ) )
+
+
+    def update_layer( self, i, x=None, y=None, **params ):
+        ''' moves the boundary ( x, y ) and/or changes parameters ( gamma, a, phi, cu, undrained ) of layer i '''
+        layer = self.layers[i]
+        regions = []
+        if x is not None and y is not None:
+            old = SOIL_MODEL.LAYER( layer.x, layer.y )
+            layer.x, layer.y = x, y
+            layer.build_index()
+            self.check_bounds( x, y )
+            self.column_cache.clear()
+            self.geometry_version += 1
+            regions.append( self.changed_region( old, layer ) )
+
+        if params:
+            for key, value in params.items():
+                setattr( layer, key, value )
+            regions.append( [ -np.inf, np.inf, max( layer.y ) ] ) # soil of layer i, extended by its end segments
+
+        self.record_change( layer, *regions )
 
 
     def set_rock( self, x, y ):
+        old = self.rock
         self.rock = SOIL_MODEL.LAYER( x, y, gamma=0.01, cu=999999 )
         self.check_bounds( x, y )
+        self.record_change( self.rock, self.changed_region( old, self.rock ) )
 
 
     def set_GW( self, x, y ):
+        old = self.GW
         self.GW = SOIL_MODEL.LAYER( x, y )
         self.check_bounds( x, y )
+        self.column_cache.clear()
+        self.record_change( self.GW, self.changed_region( old, self.GW ) )
+
+
+    def record_change( self, layer, *regions ):
+        ''' new model version, changed regions are logged for incremental re-analysis '''
+        self.version += 1
+        layer.version = self.version
+        for region in regions:
+            if region is not None:
+                self.changes.append( [ self.version ] + region )
+
+
+    def changes_since( self, version ):
+        return [ change for change in self.changes if change[0] > version ]
+
+
+    def changed_region( self, old, new ):
+        ''' [ x_from, x_to, y_max ] enclosing the difference between two layer polylines ( None: no layer ), None if equal.
+            polylines extend along their end segments ( y_from_x ), differences there give an open ( inf ) x range.
+            only circles reaching below y_max within x_from - x_to are affected.
+        '''
+        layers = [ layer for layer in ( old, new ) if layer is not None ]
+        xs = np.unique( np.concatenate( [ layer.x_sorted for layer in layers ] + [ self.bounds[0] ] ) )
+        ys = [ np.full( len(xs), np.nan ) if layer is None else layer.y_from_x( xs ) for layer in ( old, new ) ]
+
+        differs = ~( ( ys[0] == ys[1] ) | ( np.isnan( ys[0] ) & np.isnan( ys[1] ) ) )
+        if not differs.any():
+            return None
+
+        i = np.flatnonzero( differs )
+        i_from, i_to = max( i[0]-1, 0 ), min( i[-1]+1, len(xs)-1 )
+        x_from = -np.inf if i[0] == 0 else float( xs[ i_from ] )
+        x_to = np.inf if i[-1] == len(xs)-1 else float( xs[ i_to ] )
+        y_max = np.nanmax( np.concatenate( [ y[ i_from:i_to+1 ] for y in ys ] ) )
+        return [ x_from, x_to, float( y_max ) ]
+
+
+    def content_hash( self ):
+        ''' sha256 of layers, GW and rock ( polylines and parameters ), independent of edit history '''
+        h = hashlib.sha256()
+        for name, layer in [ ( 'layer', layer ) for layer in self.layers ] + [ ( 'GW', self.GW ), ( 'rock', self.rock ) ]:
+            h.update( name.encode() )
+            if layer is not None:
+                h.update( np.asarray( layer.x, dtype=float ).tobytes() )
+                h.update( np.asarray( layer.y, dtype=float ).tobytes() )
+                h.update( repr( ( layer.gamma, layer.a, layer.phi, layer.cu, layer.undrained ) ).encode() )
+        return h.hexdigest()
 
 
     def check_bounds( self, x, y ):
@@ -52,12 +140,30 @@ class SOIL_MODEL():
         if max(y)>self.bounds[1][1]: self.bounds[1][1]=max(y)
 
 
-    def get_layer_index_by_xy( self, x_cen, y_cen ):
-        for i in range( len(self.layers) ):
-            y_cen_layer = self.layers[i].y_from_x( x_cen )
-            if  y_cen_layer < y_cen:
-                return (i-1)
-        return len(self.layers)-1
+    def get_layer_index_by_xy( self, x_cen, y_cen, tops=None ):
+        ''' index of the lowest layer with its top above (x_cen, y_cen), -1 above terrain. works on arrays '''
+        if tops is None:
+            tops = self.layer_tops( x_cen )
+        below = tops < y_cen
+        i = np.where( below.any( axis=0 ), below.argmax( axis=0 ), len(self.layers) ) - 1
+        return int( i ) if np.ndim( i ) == 0 else i
+
+
+    def layer_tops( self, x ):
+        ''' y of all layers at x, shape ( n_layers, ) + shape( x ) '''
+        return np.array( [ layer.y_from_x( x ) for layer in self.layers ] )
+
+
+    def get_columns( self, x, cached=True ):
+        ''' soil columns at x: layer tops in rows 0..n_layers-1, GW level (NaN without GW) in the last row '''
+        if cached:
+            return self.column_cache.get( self, x )
+        return self.calc_columns( np.asarray( x, dtype=float ).reshape( -1 ) )
+
+
+    def calc_columns( self, x ):
+        gw = self.GW.y_from_x( x ) if self.GW else np.full( np.shape(x), np.nan )
+        return np.vstack( ( self.layer_tops( x ).reshape( len(self.layers), -1 ), np.reshape( gw, (1, -1) ) ) )
 
 
     def sort_layers( self ):
@@ -65,10 +171,64 @@ class SOIL_MODEL():
         pass
 
 
+    class COLUMN_CACHE():
+        def __init__( self, max_size=100000, batch_lookups=False ):
+            ''' LRU cache of soil columns keyed by x, max_size columns (0 disables).
+                used for per-slice lookups (lamelle), array slices only use it with batch_lookups
+                as computing a batch of columns is cheaper than one cache access per x
+            '''
+            self.max_size = max_size
+            self.batch_lookups = batch_lookups
+            self.columns = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+        def get( self, model, x ):
+            x = np.asarray( x, dtype=float ).reshape( -1 )
+            if self.max_size <= 0:
+                return model.calc_columns( x )
+
+            x_unique, inverse = np.unique( x, return_inverse=True )
+            cols = np.empty( ( len(model.layers)+1, len(x_unique) ) )
+
+            missing = []
+            for j, key in enumerate( x_unique.tolist() ):
+                col = self.columns.get( key )
+                if col is None:
+                    missing.append( j )
+                else:
+                    cols[:, j] = col
+                    self.columns.move_to_end( key )
+
+            if missing:
+                new_cols = model.calc_columns( x_unique[ missing ] )
+                cols[:, missing] = new_cols
+                for j, col in zip( missing, new_cols.T.copy() ):
+                    self.columns[ float(x_unique[j]) ] = col
+                while len( self.columns ) > self.max_size: # evict least recently used
+                    self.columns.popitem( last=False )
+
+            self.hits += len(x_unique) - len(missing) # per unique x, as misses
+            self.misses += len(missing)
+            return cols[:, inverse.reshape(-1)]
+
+        def clear( self ): # model changed
+            self.columns.clear()
+
+        def reset_stats( self ):
+            self.hits = 0
+            self.misses = 0
+
+        def get_stats( self ):
+            n = self.hits + self.misses
+            return { 'hits': self.hits, 'misses': self.misses, 'size': len(self.columns), 'hit_ratio': self.hits/n if n else 0.0 }
+
+
     class LAYER():
         def __init__( self, x=[], y=[], gamma=20.0, a=0.0, phi=0.0, cu=0.0, undrained=True, color_index=0 ):
             self.x = x
             self.y = y
+            self.build_index()
 
             self.undrained = undrained
 
@@ -79,21 +239,33 @@ class SOIL_MODEL():
             self.cu = cu
 
             self.color_i = color_index
+            self.version = 0 # model version of last change
         
-        def y_from_x( self, x ):
+        def build_index( self ):
+            ''' sorted vertex arrays for binary search, rebuild if x/y are changed '''
+            self.order = np.argsort( np.asarray( self.x, dtype=float ), kind='stable' )
+            self.x_sorted = np.asarray( self.x, dtype=float )[ self.order ]
+            self.y_sorted = np.asarray( self.y, dtype=float )[ self.order ]
+
+        def y_from_x( self, x ): # x: number or array
             i = self.get_low_x_index(x)
-            x1 =  self.x[i]
-            x2 =  self.x[i+1]
-            y1 =  self.y[i]
-            y2 =  self.y[i+1]
+            x1 =  self.x_sorted[i]
+            x2 =  self.x_sorted[i+1]
+            y1 =  self.y_sorted[i]
+            y2 =  self.y_sorted[i+1]
             
             return (y2-y1) / (x2-x1) * (x-x1) + y1
 
         def get_low_x_index( self, x ):
-            for i in range(len(self.x)-1):
-                if self.x[i]<=x and self.x[i+1]>=x:
-                    return i
-            return (len(self.x)-1)
+            ''' first segment with x[i] <= x <= x[i+1], end segments outside the layer '''
+            i = np.searchsorted( self.x_sorted, x, side='left' ) - 1
+            return np.clip( i, 0, max( len(self.x_sorted)-2, 0 ) )
+
+        def indexes_between( self, x_1, x_2 ):
+            ''' indexes of vertices with x_1 < x < x_2 '''
+            i_from = np.searchsorted( self.x_sorted, x_1, side='right' )
+            i_to = np.searchsorted( self.x_sorted, x_2, side='left' )
+            return self.order[ i_from:i_to ].tolist()
 
         def sort_coords( self ): # ensure coords are left to right
             pass
\ No newline at end of file
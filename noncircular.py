@@ -0,0 +1,211 @@
+'''
+non-circular ( piecewise linear ) failure surfaces, calculated with the slice arrays and methods used for circles
+
+    search = polyline_fs( model, n_lamelle=30, n_ctrl=3, floor='rock' )
+    report = search.search( entry=( -8, 2 ), exit=( 18, 35 ), n_random=5000, seed=1 )
+    print( report['fs_min'], report['surfaces_per_s'] )
+
+a surface starts on the terrain at x_a ( entry range ), ends on the terrain at x_b ( exit range ) and passes n_ctrl
+control points evenly spaced in x. each control point lies between terrain and floor, at a relative depth
+u ( 0: terrain, 1: floor ). the floor is the rock surface, the top of a layer ( index, surfaces then run along
+a weak layer above it ) or None ( bottom of the model bounds ). surfaces are clipped to the floor, so composite
+surfaces follow it. surfaces with slices steeper than max_alpha or with m_alpha < min_m_alpha ( drained slices,
+near the singularity of the Janbu/Bishop base force ) are invalid.
+
+a surface is given by v in [ 0, 1 ]^( 2+n_ctrl ): x_a and x_b relative to their ranges, then the depths u.
+the search evaluates n_random random surfaces in batches and refines the best ones by a random walk
+( refine='walk' ), or by Nelder-Mead from the best surfaces ( refine='nelder-mead' ).
+moment equilibrium methods need a circle center, the default is simplified Janbu.
+'''
+
+from lamelle import lamella_arrays as lam_arrays
+from methods import janbu
+from scipy.optimize import minimize
+import time
+import numpy as np
+
+
+class polyline_fs():
+    def __init__( self, model, n_lamelle=30, method=None, n_ctrl=3, floor='rock' ):
+        self.model = model
+        self.n_lamelle = n_lamelle # equal width slices, layer vertices are added as slice edges
+        self.method = method or janbu()
+        if self.method.moment_equilibrium:
+            raise ValueError( self.method.name + ' needs circular surfaces, use a force equilibrium method ( janbu )' )
+        self.n_ctrl = n_ctrl # control points between entry and exit
+        if floor is not None and floor != 'rock' and not 0 < floor < len( model.layers ):
+            raise ValueError( 'floor must be rock, None or the index of a layer below the terrain ( 1.. )' )
+        self.floor = floor # 'rock', layer index or None ( model bounds )
+        self.batch_size = 2000 # surfaces per slice batch
+        self.min_width = 0.5 # m, shorter surfaces are invalid
+        self.max_alpha = 60 # deg, max base inclination of a slice
+        self.min_m_alpha = 0.2 # ( 1+tan(phi)*tan(alpha)/F )*cos(alpha), drained slices
+        self.search_report = None
+
+
+    def floor_y( self, x ):
+        if self.floor == 'rock' and self.model.rock:
+            return self.model.rock.y_from_x( x )
+        if self.floor is None or self.floor == 'rock': # depth bounded by the model
+            return np.full( np.shape( x ), float( self.model.bounds[1][0] ) )
+        return self.model.layers[ self.floor ].y_from_x( x )
+
+
+    def breakpoints( self ):
+        ''' layer and floor vertices, used as slice edges within each surface '''
+        lines = list( self.model.layers )
+        if self.floor == 'rock' and self.model.rock:
+            lines.append( self.model.rock )
+        return np.unique( np.concatenate( [ np.asarray( line.x, dtype=float ) for line in lines ] ) )
+
+
+    def surfaces( self, v, entry, exit ):
+        ''' slice edge coordinates ( x_lists, y_lists ) of surfaces v ( n, 2+n_ctrl ), invalid surfaces as empty lists '''
+        v = np.atleast_2d( v )
+        x_a = entry[0] + v[:, 0] * ( entry[1]-entry[0] )
+        x_b = exit[0] + v[:, 1] * ( exit[1]-exit[0] )
+        width = x_b - x_a
+        valid = width >= self.min_width
+
+        # control polylines, ends on terrain
+        terrain = self.model.layers[0]
+        frac = np.linspace( 0, 1, self.n_ctrl+2 )
+        x_ctrl = x_a[:, None] + width[:, None] * frac
+        t_ctrl = terrain.y_from_x( x_ctrl )
+        f_ctrl = np.minimum( self.floor_y( x_ctrl ), t_ctrl )
+        u = np.zeros( x_ctrl.shape )
+        u[:, 1:-1] = v[:, 2:]
+        y_ctrl = t_ctrl - u * ( t_ctrl-f_ctrl )
+
+        # slice edges: equal widths + breakpoints inside the surface, duplicates and points outside as NaN ( sorted last )
+        breaks = self.breakpoints()
+        x = np.concatenate( ( x_a[:, None] + width[:, None] * np.linspace( 0, 1, self.n_lamelle+1 ), np.broadcast_to( breaks, ( len(v), len(breaks) ) ) ), axis=1 )
+        x[ ( x < x_a[:, None] ) | ( x > x_b[:, None] ) | ~valid[:, None] ] = np.nan
+        x.sort( axis=1 )
+        dup = np.zeros( x.shape, dtype=bool )
+        with np.errstate( invalid='ignore' ):
+            dup[:, 1:] = np.diff( x, axis=1 ) < 1e-6 * np.maximum( width[:, None], 1 )
+        x[ dup ] = np.nan
+        x.sort( axis=1 )
+
+        # surface at the edges: control polyline ( evenly spaced in x ) clipped to floor and terrain
+        with np.errstate( invalid='ignore', divide='ignore' ):
+            s = np.clip( ( x-x_a[:, None] ) / width[:, None] * ( self.n_ctrl+1 ), 0, self.n_ctrl+1 )
+        i = np.clip( np.nan_to_num( s ).astype( int ), 0, self.n_ctrl )
+        w = s - i
+        y = np.take_along_axis( y_ctrl, i, axis=1 ) * ( 1-w ) + np.take_along_axis( y_ctrl, i+1, axis=1 ) * w
+        keep = ~np.isnan( x )
+        x_flat = x[ keep ]
+        y_flat = np.minimum( np.maximum( y[ keep ], self.floor_y( x_flat ) ), terrain.y_from_x( x_flat ) )
+
+        splits = np.cumsum( keep.sum( axis=1 ) )[:-1]
+        return np.split( x_flat, splits ), np.split( y_flat, splits )
+
+
+    def calc_surfaces( self, x_lists, y_lists ):
+        ''' FS of polyline surfaces ( slice edge coordinates, left to right ) and their slice arrays.
+            surfaces without valid FS ( too short, NaN, F <= 0, too steep or m_alpha < min_m_alpha ) get inf.
+        '''
+        n = len( x_lists )
+        F = np.full( n, np.inf )
+        ok = np.array( [ len( x ) > 1 for x in x_lists ], dtype=bool )
+        if not ok.any():
+            return F, None
+
+        with np.errstate( divide='ignore', invalid='ignore' ): # zero thickness slices along the terrain
+            slices = lam_arrays( self.model, [ x for x, k in zip( x_lists, ok ) if k ], [ y for y, k in zip( y_lists, ok ) if k ] )
+            F_ok, _ = self.method.calc_fs( slices )
+            m_alpha = ( 1 + slices.tan_phi * slices.tan_alpha / F_ok[ slices.surface_index ] ) * slices.cos_alpha
+        bad = ( np.abs( slices.alpha ) > np.radians( self.max_alpha ) ) | ( ~slices.undrained & ~( m_alpha >= self.min_m_alpha ) )
+        bad_surface = np.bincount( slices.surface_index, bad, minlength=len( F_ok ) ) > 0
+        F[ ok ] = np.where( np.isfinite( F_ok ) & ( F_ok > 0 ) & ~bad_surface, F_ok, np.inf )
+        return F, slices
+
+
+    def evaluate( self, v, entry, exit ):
+        ''' FS of surfaces v ( n, 2+n_ctrl ) in batches of batch_size '''
+        v = np.atleast_2d( v )
+        F = np.empty( len( v ) )
+        for i in range( 0, len( v ), self.batch_size ):
+            F[ i:i+self.batch_size ] = self.calc_surfaces( *self.surfaces( v[ i:i+self.batch_size ], entry, exit ) )[0]
+        return F
+
+
+    def search( self, entry, exit, n_random=5000, n_best=10, refine='walk', n_steps=100, n_trials=50, step=0.1, min_step=0.002,
+                max_eval=300, seed=None ):
+        ''' critical surface with entry x in entry=( x_from, x_to ) and exit x in exit=( x_from, x_to ).
+            random surfaces, then refinement of the n_best lowest FS surfaces:
+                walk: n_trials random steps ( normal, std step ) per surface and iteration, the best step is taken if it lowers FS.
+                      step is halved when no surface improved, the walk stops below min_step or after n_steps.
+                nelder-mead: scipy Nelder-Mead from each of the n_best surfaces, max_eval evaluations each.
+            returns the critical surface ( x, y, safety, undrained, v ), evaluations, time and the FS history of the refinement.
+        '''
+        rng = np.random.default_rng( seed )
+        n_dim = 2 + self.n_ctrl
+        t_0 = time.perf_counter()
+
+        v = rng.uniform( 0, 1, ( n_random, n_dim ) )
+        F = self.evaluate( v, entry, exit )
+        n_evaluated = n_random
+        best = np.argsort( F )[ :n_best ]
+        v_best, F_best = v[ best ], F[ best ]
+        history = [ float( F_best[0] ) ]
+
+        if refine == 'walk':
+            for _ in range( n_steps ):
+                trials = np.clip( np.repeat( v_best, n_trials, axis=0 ) + rng.normal( 0, step, ( len(v_best)*n_trials, n_dim ) ), 0, 1 )
+                F_trials = self.evaluate( trials, entry, exit ).reshape( len(v_best), n_trials )
+                n_evaluated += len( trials )
+
+                j = np.argmin( F_trials, axis=1 )
+                F_new = F_trials[ np.arange( len(v_best) ), j ]
+                better = F_new < F_best
+                v_best[ better ] = trials.reshape( len(v_best), n_trials, n_dim )[ better, j[ better ] ]
+                F_best[ better ] = F_new[ better ]
+                history.append( float( F_best.min() ) )
+
+                if not better.any():
+                    step /= 2
+                    if step < min_step:
+                        break
+
+        elif refine == 'nelder-mead':
+            for i in range( len( v_best ) ):
+                res = minimize( lambda v_i: min( self.evaluate( v_i, entry, exit )[0], 1e6 ), v_best[i], method='Nelder-Mead',
+                                bounds=[ (0, 1) ]*n_dim, options={ 'maxfev': max_eval, 'xatol': 1e-4, 'fatol': 1e-5 } )
+                n_evaluated += res.nfev
+                if res.fun < F_best[i]:
+                    v_best[i], F_best[i] = res.x, res.fun
+                history.append( float( F_best.min() ) )
+
+        elif refine is not None:
+            raise ValueError( 'unknown refine: ' + str( refine ) )
+
+        dt = time.perf_counter() - t_0
+        order = np.argsort( F_best )
+        self.search_report = {
+            'critical': self.get_surface( v_best[ order[0] ], entry, exit ) if np.isfinite( F_best[ order[0] ] ) else None,
+            'fs_min': float( F_best[ order[0] ] ) if np.isfinite( F_best[ order[0] ] ) else None,
+            'best': [ ( float( F_best[i] ), v_best[i].tolist() ) for i in order ],
+            'n_evaluated': n_evaluated,
+            'time': dt,
+            'surfaces_per_s': n_evaluated / dt,
+            'history': history
+        }
+        return self.search_report
+
+
+    def get_surface( self, v, entry, exit ):
+        ''' fs dict of one surface, with its slices '''
+        x_lists, y_lists = self.surfaces( v, entry, exit )
+        F, slices = self.calc_surfaces( x_lists, y_lists )
+        return {
+            'x': x_lists[0].tolist(),
+            'y': y_lists[0].tolist(),
+            'start_x': float( x_lists[0][0] ),
+            'end_x': float( x_lists[0][-1] ),
+            'safety': float( F[0] ),
+            'undrained': bool( slices.surface_undrained()[0] ) if slices is not None else None,
+            'v': np.asarray( v ).tolist(),
+            'slices': slices
+        }
@@ -0,0 +1,96 @@
+'''
+parameter distributions for probabilistic FS ( sircular_cylindric_fs.monte_carlo )
+
+    distributions = { 0: { 'cu': lognormal( 32, 6 ), 'gamma': normal( 19, 0.5 ) } } # by layer index
+    gw_shift = uniform( -1, 1 ) # vertical shift of the GW profile
+
+samples are drawn in a fixed order ( layers, then gamma, a, phi, cu, then GW ) from one numpy Generator,
+the same seed gives the same realizations with or without workers.
+'''
+
+import numpy as np
+
+LAYER_PARAMS = ( 'gamma', 'a', 'phi', 'cu' )
+
+
+class distribution():
+    def sample( self, rng, n ):
+        raise NotImplementedError
+
+
+
+class normal( distribution ):
+    ''' normal distribution, samples optionally clipped to [ low, high ] '''
+    def __init__( self, mean, std, low=None, high=None ):
+        self.mean = mean
+        self.std = std
+        self.low = low
+        self.high = high
+
+    def sample( self, rng, n ):
+        values = rng.normal( self.mean, self.std, n )
+        if self.low is not None or self.high is not None:
+            values = np.clip( values, self.low, self.high )
+        return values
+
+
+
+class lognormal( distribution ):
+    ''' lognormal distribution given by mean and std of the parameter ( not of its logarithm ) '''
+    def __init__( self, mean, std ):
+        self.mean = mean
+        self.std = std
+
+    def sample( self, rng, n ):
+        sigma_ln = np.sqrt( np.log( 1 + (self.std/self.mean)**2 ) )
+        mu_ln = np.log( self.mean ) - sigma_ln**2 / 2
+        return rng.lognormal( mu_ln, sigma_ln, n )
+
+
+
+class uniform( distribution ):
+    def __init__( self, low, high ):
+        self.low = low
+        self.high = high
+
+    def sample( self, rng, n ):
+        return rng.uniform( self.low, self.high, n )
+
+
+
+def sample_layer_params( layers, distributions, n, rng ):
+    ''' ( n_layers, n ) arrays per parameter, parameters without distribution keep their layer value '''
+    params = {}
+    for key in LAYER_PARAMS:
+        values = np.array( [ getattr( layer, key ) for layer in layers ], dtype=float )
+        params[ key ] = np.repeat( values[:, None], n, axis=1 )
+
+    for i in sorted( distributions ):
+        for key in LAYER_PARAMS:
+            if key in distributions[i]:
+                params[ key ][i] = distributions[i][ key ].sample( rng, n )
+    return params
+
+
+def summary( F ):
+    ''' statistics of a FS sample, realizations without valid FS ( NaN/inf ) are excluded.
+        beta = ( mean-1 )/std, beta_lognormal assumes lognormal FS.
+    '''
+    F = np.asarray( F, dtype=float )
+    valid = F[ np.isfinite( F ) ]
+    res = { 'n': len( F ), 'n_valid': len( valid ), 'mean': None, 'std': None, 'cov': None,
+            'beta': None, 'beta_lognormal': None, 'pf': None, 'percentiles': None }
+    if len( valid ) == 0:
+        return res
+
+    mean, std = float( valid.mean() ), float( valid.std( ddof=1 ) ) if len( valid ) > 1 else 0.0
+    res['mean'] = mean
+    res['std'] = std
+    res['pf'] = float( np.mean( valid < 1 ) )
+    res['percentiles'] = { p: float( v ) for p, v in zip( ( 5, 50, 95 ), np.percentile( valid, ( 5, 50, 95 ) ) ) }
+    if std > 0 and mean > 0:
+        cov = std / mean
+        res['cov'] = cov
+        res['beta'] = ( mean-1 ) / std
+        res['beta_lognormal'] = float( np.log( mean/np.sqrt( 1+cov**2 ) ) / np.sqrt( np.log( 1+cov**2 ) ) )
+    return res
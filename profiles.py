@@ -0,0 +1,178 @@
+'''
+import of surveyed cross-section profiles ( dense point lists ) as model layers
+
+    report = import_profile( model, 'P1200_terrain.csv', tolerance=0.05, gamma=19, a=10, phi=29, cu=32, undrained=False )
+    print( report ) # { 'n_points': 4213, 'n_kept': 37, 'reduction': 0.991, 'max_deviation': 0.049 }
+
+profiles are simplified ( Douglas-Peucker ) before LAYERs are built, the cost of intersections and y_from_x
+then depends on the tolerance instead of the survey density. deviations are measured vertically, as layers are
+evaluated as y( x ). max_points optionally caps the vertex count, the largest deviations are kept first.
+
+point files:
+    CSV: x/y columns ( header x,y or station/offset,elevation/z ), or the first two numeric columns without header.
+         an optional name/profile/layer column holds several profiles in one file. delimiter , ; tab or spaces.
+    LandXML: PntList2D elements ( "station elevation station elevation ..." ), or elements with point children
+         ( PVI, P, ... ) of "station elevation" text. profiles are named by the name attribute of their element or parent.
+'''
+
+import xml.etree.ElementTree as ET
+import numpy as np
+import heapq
+import csv
+
+X_NAMES = ( 'x', 'station', 'sta', 'offset', 'distance', 'chainage' )
+Y_NAMES = ( 'y', 'z', 'elevation', 'elev', 'level', 'height' )
+NAME_NAMES = ( 'name', 'profile', 'layer', 'surface' )
+
+
+def read_points( path ):
+    ''' { profile name: ( x, y ) } from a CSV or LandXML file, points sorted by x '''
+    if path.lower().endswith( '.xml' ):
+        profiles = read_landxml( path )
+    else:
+        profiles = read_csv( path )
+    return { name: sort_points( x, y ) for name, ( x, y ) in profiles.items() }
+
+
+def read_csv( path ):
+    with open( path, newline='' ) as f:
+        text = f.read()
+    try:
+        dialect = csv.Sniffer().sniff( text[:4096], delimiters=',;\t ' )
+        rows = list( csv.reader( text.splitlines(), dialect ) )
+    except csv.Error: # single column or irregular spaces
+        rows = [ line.split() for line in text.splitlines() ]
+    rows = [ [ cell.strip() for cell in row if cell.strip() ] for row in rows ]
+    rows = [ row for row in rows if row ]
+
+    i_x, i_y, i_name = 0, 1, None
+    if rows and not is_number( rows[0][0] ) and not is_number( rows[0][-1] ): # header
+        header = [ cell.lower() for cell in rows.pop( 0 ) ]
+        i_x = column( header, X_NAMES, 0 )
+        i_y = column( header, Y_NAMES, 1 )
+        i_name = column( header, NAME_NAMES, None )
+
+    profiles = {}
+    for row in rows:
+        name = row[ i_name ] if i_name is not None else 'profile'
+        x, y = profiles.setdefault( name, ( [], [] ) )
+        x.append( float( row[ i_x ] ) )
+        y.append( float( row[ i_y ] ) )
+    return profiles
+
+
+def column( header, names, default ):
+    for name in names:
+        if name in header:
+            return header.index( name )
+    return default
+
+
+def is_number( value ):
+    try:
+        float( value )
+        return True
+    except ValueError:
+        return False
+
+
+def read_landxml( path ):
+    root = ET.parse( path ).getroot()
+    parents = { child: parent for parent in root.iter() for child in parent }
+
+    profiles = {}
+    for element in root.iter():
+        tag = element.tag.split( '}' )[-1] # without namespace
+        if tag == 'PntList2D':
+            values = [ float( v ) for v in element.text.split() ]
+            points = ( values[0::2], values[1::2] )
+        else: # elements with point children
+            points = [ child.text.split() for child in element if child.text and len( child ) == 0 ]
+            if len( points ) < 2 or len( points ) != len( element ) or not all( len( p ) == 2 and all( is_number( v ) for v in p ) for p in points ):
+                continue
+            points = ( [ float( p[0] ) for p in points ], [ float( p[1] ) for p in points ] )
+
+        owner = element if element.get( 'name' ) else parents.get( element, element )
+        name = owner.get( 'name' ) or tag + ' ' + str( len( profiles ) )
+        while name in profiles:
+            name += "'"
+        profiles[ name ] = points
+    return profiles
+
+
+def sort_points( x, y ):
+    ''' points in x order, for repeated x ( vertical steps ) the last point is kept '''
+    x, y = np.asarray( x, dtype=float ), np.asarray( y, dtype=float )
+    order = np.argsort( x, kind='stable' )
+    x, y = x[ order ], y[ order ]
+    last = np.append( x[1:] != x[:-1], True )
+    return x[ last ], y[ last ]
+
+
+def simplify( x, y, tolerance=0.05, max_points=None ):
+    ''' Douglas-Peucker simplification of a polyline sorted by x, vertical deviation <= tolerance.
+        segments are split at their largest deviation first, so max_points keeps the most significant vertices.
+        returns indexes of the kept points.
+    '''
+    x, y = np.asarray( x, dtype=float ), np.asarray( y, dtype=float )
+    n = len( x )
+    if n <= 2:
+        return np.arange( n )
+
+    def split( i, j ): # largest deviation between vertices i and j
+        if j-i < 2:
+            return None
+        x_in, y_in = x[ i+1:j ], y[ i+1:j ]
+        dev = np.abs( y_in - ( y[i] + ( y[j]-y[i] ) * ( x_in-x[i] ) / ( x[j]-x[i] ) ) )
+        k = int( np.argmax( dev ) )
+        return ( -dev[k], i, j, i+1+k )
+
+    keep = [ 0, n-1 ]
+    heap = [ split( 0, n-1 ) ]
+    while heap:
+        neg_dev, i, j, k = heapq.heappop( heap )
+        if -neg_dev <= tolerance or ( max_points and len( keep ) >= max_points ):
+            break
+        keep.append( k )
+        for segment in ( split( i, k ), split( k, j ) ):
+            if segment is not None:
+                heapq.heappush( heap, segment )
+    return np.sort( keep )
+
+
+def max_deviation( x, y, x_kept, y_kept ):
+    ''' largest vertical distance between the original points and the simplified polyline '''
+    return float( np.max( np.abs( np.asarray( y ) - np.interp( x, x_kept, y_kept ) ) ) ) if len( x ) else 0.0
+
+
+def simplify_profile( x, y, tolerance=0.05, max_points=None ):
+    ''' simplified ( x, y ) and report: n_points, n_kept, reduction, max_deviation '''
+    x, y = sort_points( x, y )
+    keep = simplify( x, y, tolerance, max_points )
+    x_kept, y_kept = x[ keep ], y[ keep ]
+    report = { 'n_points': len( x ), 'n_kept': len( keep ), 'reduction': 1 - len( keep )/len( x ) if len( x ) else 0.0,
+               'max_deviation': max_deviation( x, y, x_kept, y_kept ) }
+    return x_kept.tolist(), y_kept.tolist(), report
+
+
+def import_profile( model, path, tolerance=0.05, max_points=None, name=None, kind='layer', **params ):
+    ''' adds a profile from a point file to the model as layer ( params: gamma, a, phi, cu, undrained ), 'gw' or 'rock'.
+        name selects a profile in files with several, default the first. returns the simplification report.
+    '''
+    profiles = read_points( path )
+    if not profiles:
+        raise ValueError( path + ': no points' )
+    if name is None:
+        name = next( iter( profiles ) )
+    x, y, report = simplify_profile( *profiles[ name ], tolerance, max_points )
+
+    if kind == 'layer':
+        model.add_layer( x, y, **dict( { 'gamma': 20, 'a': 0, 'phi': 0, 'cu': 0 }, **params ) )
+    elif kind == 'gw':
+        model.set_gw( x, y )
+    elif kind == 'rock':
+        model.set_rock( x, y )
+    else:
+        raise ValueError( 'unknown kind ' + str( kind ) )
+    report['name'] = name
+    return report
@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import matplotlib.colors
+from matplotlib.collections import LineCollection
 from numpy import tanh, arctanh
 import scipy.interpolate
 import numpy as np
@@ -47,13 +48,20 @@ class MODEL_RENDERER():
 
         self.contour_ints = [self.fs_bounds['low'] + i*n_contour_increment for i in range(n_contour_ints+1)]
 
-        self.center_map = {}
+        self.center_map = {} # mesh x, y and lowest fs per center from last grid render
+        self.center_map_method = 'auto' # 'grid' ( regular center grid ), 'rbf' or 'griddata', 'auto': grid if regular, else griddata
+        self.n_int = 200 # mesh size for interpolated center maps
+        self.max_surfaces = None # grid search: draw only the max_surfaces lowest FS ( None: all )
+        self.rbf_neighbors = 16 # nearest centers per RBF evaluation ( smoother than griddata, ~1s for a 200x200 mesh )
 
         self.model = MODEL
         self.fs = STABILITY
 
 
-    def render( self ):
+    def render( self, file=None, show=None, dpi=150 ):
+        ''' draws model and failure surfaces. with file ( .png, .svg, ... ) the figure is saved,
+            it is only shown if show ( default: when no file is given ).
+        '''
         figure, ax = plt.subplots( figsize=(10,6) )
 
         if self.model.GW:
@@ -61,47 +69,30 @@ class MODEL_RENDERER():
 
         for layer in self.model.layers:
             ax.plot( layer.x, layer.y, c=self.colors["layers"][layer.color_i] )
-        ax.plot( self.model.rock.x, self.model.rock.y, c=self.colors["rock_surface"] )
+        if self.model.rock:
+            ax.plot( self.model.rock.x, self.model.rock.y, c=self.colors["rock_surface"] )
 
 
         # plot circular FS
-        if self.fs.fs_manager.score_id: # grid search
+        fs_manager = self.fs.fs_manager
+        if fs_manager.ranking is not None: # grid search
             cmap = matplotlib.colors.LinearSegmentedColormap.from_list( "", ['red','orange','yellow','green','blue'] )
             
-            n_circles = len(self.fs.fs_manager.score_id)
-
-            for key in self.fs.fs_manager.fs: # plot each fs
-                fs = self.fs.fs_manager.fs[ key ]
-                F = fs['safety']
-                c = cmap( self.calc_c_val( F ) ) 
-                self.plot_fs( ax, fs, color=c, lw=self.lw['grid-search'], zorder=n_circles-self.fs.fs_manager.score_id[key] )
-
-                # build center map
-                cen_key = tuple( list(key[0:2]) )
-                if cen_key in self.center_map.keys():
-                    if self.center_map[ cen_key ][0] > F:
-                        self.center_map[ cen_key ] = [F, c]
-                else:
-                    self.center_map[ cen_key ] = [F, c]
+            store = fs_manager.store
+            n_circles = store.n
 
+            # all fs as one collection, lowest FS drawn last ( on top ), optionally only the max_surfaces lowest
+            rows = fs_manager.ranking[ :self.max_surfaces ][ ::-1 ]
+            segments = [ np.column_stack( self.fs.get_fs_xy( fs_manager.get_fs( store.keys[row] ) ) ) for row in rows ]
+            colors = cmap( self.calc_c_val( store.safety[ rows ] ) )
+            ax.add_collection( LineCollection( segments, colors=colors, linewidths=self.lw['grid-search'] ) )
 
             # build center map
-            x_cen = []
-            y_cen = []
-            f_cen = []
-            for key in self.center_map:
-                x, y = list(key)
-                x_cen.append(x)
-                y_cen.append(y)
-                f_cen.append( self.center_map[key][0] )
-
-            n_int = 200
-            xi, yi = np.linspace( min(x_cen), max(x_cen), n_int), np.linspace(min(y_cen), max(y_cen), n_int)
-            xi, yi = np.meshgrid(xi, yi)
-
-            rbf = scipy.interpolate.Rbf( x_cen, y_cen, f_cen, function='linear' )
-            fi = rbf(xi, yi)
-            cen_map = ax.pcolormesh( xi, yi, fi, cmap=cmap )
+            xi, yi, fi = self.calc_center_map( store.center_x[ :n_circles ], store.center_y[ :n_circles ], store.safety[ :n_circles ] )
+            self.center_map = { 'x': xi, 'y': yi, 'fs': fi }
+
+            shading = 'nearest' if np.isnan( fi ).any() else 'gouraud'
+            cen_map = ax.pcolormesh( xi, yi, fi, cmap=cmap, shading=shading )
             
             contour_ls = 'dashed'
             c_plt = ax.contour( xi, yi, fi, self.contour_ints, linestyles=[contour_ls], linewidths=[self.lw['contours']], colors=[self.colors['contours']] )
@@ -110,11 +101,10 @@ class MODEL_RENDERER():
                 cb.ax.plot( [0,1], [some_interval]*2, ls=contour_ls, lw=self.lw['contours'], c=self.colors['contours'] )
 
 
-            key = min(self.fs.fs_manager.score_id, key=self.fs.fs_manager.score_id.get)
-            fs = self.fs.fs_manager.fs[ key ]
+            fs = fs_manager.get_critical_fs()
 
-            if self.fs.fs_manager.grid:
-                ax.plot( self.fs.fs_manager.grid['x'], self.fs.fs_manager.grid['y'], c=self.colors["grid"] )
+            if fs_manager.grid:
+                ax.plot( fs_manager.grid['x'], fs_manager.grid['y'], c=self.colors["grid"] )
 
             self.plot_fs( ax, fs, annotate=True, color=(0,0,0) )
             #figure.colorbar(cmap, label='Fs')#, loc='r', length=0.7, ticks=0.1
@@ -122,14 +112,55 @@ class MODEL_RENDERER():
 
 
         else:
-            plt_lamellas = True if len(self.fs.fs_manager.fs) == 1 else False
-            for key in self.fs.fs_manager.fs:
-                fs = self.fs.fs_manager.fs[key]
+            plt_lamellas = True if len(fs_manager.fs) == 1 else False
+            for key in fs_manager.fs:
+                fs = fs_manager.fs[key]
                 self.plot_fs( ax, fs, annotate=True, lamellas=plt_lamellas )
 
         ax.axis('equal')
         #ax.grid()
-        plt.show()
+        if file:
+            figure.savefig( file, dpi=dpi )
+        if show or ( show is None and not file ):
+            plt.show()
+        else:
+            plt.close( figure )
+
+
+    def calc_center_map( self, x, y, F ):
+        ''' lowest FS per circle center on a mesh. centers of a regular grid are used directly,
+            other center sets ( adaptive/continuous searches ) are interpolated on an n_int x n_int mesh.
+        '''
+        valid = ~np.isnan( F )
+        centers, inverse = np.unique( np.column_stack( ( x[valid], y[valid] ) ), axis=0, return_inverse=True )
+        f_cen = np.full( len(centers), np.inf )
+        np.minimum.at( f_cen, inverse.reshape( -1 ), np.where( F[valid] > 0, F[valid], np.inf ) ) # F <= 0 ( no failure ) as in result_store.rank_key
+        f_cen[ np.isinf( f_cen ) ] = np.nan # centers without failure surface
+        x_cen, y_cen = centers[:, 0], centers[:, 1]
+
+        ux, ix = np.unique( x_cen, return_inverse=True )
+        uy, iy = np.unique( y_cen, return_inverse=True )
+        method = self.center_map_method
+        if method == 'auto':
+            method = 'grid' if len(ux)*len(uy) <= 2*len(centers) else 'griddata'
+
+        if method == 'grid':
+            fi = np.full( ( len(uy), len(ux) ), np.nan )
+            fi[ iy.reshape( -1 ), ix.reshape( -1 ) ] = f_cen
+            xi, yi = np.meshgrid( ux, uy )
+            return xi, yi, fi
+
+        n_int = self.n_int
+        xi, yi = np.meshgrid( np.linspace( x_cen.min(), x_cen.max(), n_int ), np.linspace( y_cen.min(), y_cen.max(), n_int ) )
+        mesh = np.column_stack( ( xi.reshape( -1 ), yi.reshape( -1 ) ) )
+        if method == 'rbf':
+            try: # local linear RBF, cost grows with neighbors instead of n_centers**2
+                rbf = scipy.interpolate.RBFInterpolator( centers, f_cen, kernel='linear', neighbors=min( self.rbf_neighbors, len(centers) ) )
+                return xi, yi, rbf( mesh ).reshape( xi.shape )
+            except ( AttributeError, ValueError, np.linalg.LinAlgError ): # old scipy, too few/collinear centers: griddata
+                pass
+        fi = scipy.interpolate.griddata( centers, f_cen, mesh, method='linear' ) if len(centers) > 2 else np.full( len(mesh), f_cen.min() )
+        return xi, yi, fi.reshape( xi.shape )
 
 
     def calc_c_val( self, F ):
@@ -158,6 +189,8 @@ class MODEL_RENDERER():
             s_lw = lw
 
 
+        fs_x, fs_y = self.fs.get_fs_xy( fs )
+
         if annotate:
             # fs_def
             label = 'F'
@@ -168,19 +201,19 @@ class MODEL_RENDERER():
             if fs['safety']:
                 label += str( round(fs['safety'], 3) )
 
-            x_radius = [ fs['x'][0], fs['center_x'], fs['x'][-1] ]
-            y_radius = [ fs['y'][0], fs['center_y'], fs['y'][-1] ]
+            x_radius = [ fs_x[0], fs['center_x'], fs_x[-1] ]
+            y_radius = [ fs_y[0], fs['center_y'], fs_y[-1] ]
             ax.plot( x_radius, y_radius, c=c, lw=s_lw ) # circle definition
             plt.text( fs['center_x'], fs['center_y']+1, label )#, fontdict=font)
 
 
-        ax.plot( fs['x'], fs['y'], c=c, lw=s_lw, zorder=zorder ) # shear surface
+        ax.plot( fs_x, fs_y, c=c, lw=s_lw, zorder=zorder ) # shear surface
 
         if cmap:
-            ax.scatter( fs['x'][0], fs['y'][0], c=c, cmap=cmap )
+            ax.scatter( fs_x[0], fs_y[0], c=c, cmap=cmap )
 
 
         if lamellas:
-            for lam_index in range(len(fs['lamellas'].lamellas)):
-                x,y = fs['lamellas'].lamellas[lam_index].get_xy()
-                ax.plot( x, y, c=self.colors["lamellas"], lw=self.lw["lamellas"], zorder=-10)
\ No newline at end of file
+            lamella_list = self.fs.get_lamellas( fs ).lamellas
+            segments = [ np.column_stack( lamella.get_xy() ) for lamella in lamella_list ]
+            ax.add_collection( LineCollection( segments, colors=[ self.colors["lamellas"] ], linewidths=self.lw["lamellas"], zorder=-10 ) )
\ No newline at end of file
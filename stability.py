@@ -1,25 +1,58 @@
 from tqdm import tqdm
 from lamelle import lamellas as lam
+from lamelle import lamella_arrays as lam_arrays
+from methods import bishop
+from probabilistic import sample_layer_params, summary
 from numpy import cos, arccos, arctan2
-import copy
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+from scipy.optimize import minimize
+import hashlib
+import heapq
+import json
+import time
+import sys
+import numpy as np
 
 
 class sircular_cylindric_fs():
-    def __init__( self, model, n_lamelle=30 ):
+    def __init__( self, model, n_lamelle=30, keep_details=None, method=None, cache_geometry=False, cache=None ):
         self.def_incr = 5 # default increments for grid search
+        self.batch_size = 500 # circles per slice batch in grid search
+        self.no_fs_penalty = 100.0 # objective for circles without failure surface in minimize_fs
+        self.progress = True # tqdm progress bars in searches
+        self.batch_slices = None # slices of last calculated batch
+        self.mc_slices = 1000000 # max slices per realization chunk in monte_carlo
+        self.n_prescreen = 32 # sample points per circle in prescreen
+        self.min_cut_depth = 0.0 # prescreen: prune circles cutting less into terrain ( 0: off )
+        self.prune_factor = 1.1 # prescreen: prune if FS lower bound > prune_factor * best FS
+        self.prune_counts = self.new_prune_counts()
+
+        self.cache_geometry = cache_geometry # keep slice batches for recalc_fs ( soil parameter/GW changes ), serial runs only
+        self.geometry = [] # cached [ fs_ids, slices ] per batch
+        self.geometry_version = None # model.geometry_version of cached slices
         self.model = model
         self.n_lamelle = n_lamelle
-        self.fs_manager = sircular_cylindric_fs.failure_surface_manager()
+        self.method = method if method else bishop() # limit equilibrium method ( methods.py )
+        self.fs_manager = sircular_cylindric_fs.failure_surface_manager( keep_details=keep_details )
+        self.cache = cache # persistent results ( fs_cache.FS_CACHE ), None: off
+        self.profile = False # collect per stage timings/counters in stats
+        self.stats = sircular_cylindric_fs.calc_stats()
 
 
     def sort( self, grid ):
         self.fs_manager.sort( grid )
 
 
+    def clear_fs( self ):
+        self.fs_manager.clear_fs()
+        self.geometry = []
+
+
     def print_geom( self ):
-        for fs_key in self.fs_manager.fs:
-            fs = self.fs_manager.fs[fs_key]
-            for lamella in fs['lamellas'].lamellas:
+        for fs in self.fs_manager.get_detailed_fs():
+            for lamella in self.get_lamellas( fs ).lamellas:
                 coords = ''
                 coords += str( lamella.x1_4 ) + ", " + str( lamella.y1 )
                 coords += ", " + str( lamella.x2_3 ) + ", " + str( lamella.y2 )
@@ -30,9 +63,8 @@ class sircular_cylindric_fs():
 
     def print_gv( self ): # for backcalculations
         if self.model.GW:
-            for fs_key in self.fs_manager.fs:
-                fs = self.fs_manager.fs[fs_key]
-                lamellas = fs["lamellas"].lamellas
+            for fs in self.fs_manager.get_detailed_fs():
+                lamellas = self.get_lamellas( fs ).lamellas
                 i=0
                 for lamella in lamellas:
                     i += 1
@@ -46,103 +78,715 @@ class sircular_cylindric_fs():
             print('no GW defined')
 
 
-    def grid_search( self, search_field=None, increments=None, clear_FS=False ):
+    def grid_search( self, search_field=None, increments=None, clear_FS=False, workers=None, prune=False, incremental=False ):
+        ''' FS of all grid circles. with prune, circles that can not be critical are skipped ( prescreen ).
+            with incremental, stored results are reused for circles not touched by model changes since
+            their calculation ( changed_circles ). returns circles calculated, reused and pruned per reason.
+        '''
         if clear_FS:
-            self.fs_manager.clear_fs()
+            self.clear_fs()
+        if self.profile: # stats cover the last grid search
+            self.stats.reset()
+        t_0 = time.perf_counter()
 
-        # set grid        
-        x_from = search_field[ 'x_from' ] if search_field else 0
-        y_from = search_field[ 'y_from' ] if search_field else 10
-        x_to = search_field[ 'x_to' ] if search_field else 10
-        y_to = search_field[ 'y_to' ] if search_field else 20
-        upper_tangent = search_field[ 'upper_tangent' ] if search_field else 0
-        lower_tangent = search_field[ 'lower_tangent' ] if search_field else -10
+        calc_list, grid = self.grid_calc_list( search_field, increments )
+        n_circles = len( calc_list )
+        if incremental:
+            calc_list = self.changed_circles( calc_list )
+            if self.profile:
+                self.stats.count( 'circles_reused', n_circles-len(calc_list) )
 
-        # set increments
+        self.prune_counts = self.new_prune_counts()
+        self.calc_circle_list( calc_list, workers=workers, prune=prune )
+
+        self.sort( grid )
+        if self.profile:
+            self.stats.add( 'grid_search', time.perf_counter()-t_0 )
+
+        n_pruned = sum( self.prune_counts.values() )
+        self.prune_report = { 'n_circles': n_circles, 'n_reused': n_circles-len(calc_list), 'n_calculated': len(calc_list)-n_pruned,
+                              'n_pruned': n_pruned, 'pruned': dict( self.prune_counts ) }
+        return self.prune_report
+
+
+    def changed_circles( self, calc_list ):
+        ''' circles of calc_list to ( re )calculate: not calculated before, or reaching into a region changed since
+            ( model.changes ). stored results of circles to recalculate are removed, others are kept as they are.
+        '''
+        keys = [ self.fs_manager.gen_fs_key( *c ) for c in calc_list ]
+        version = np.array( [ self.fs_manager.evaluated.get( key, -1 ) for key in keys ] )
+        redo = version < 0
+
+        if ( ~redo ).any():
+            circles = np.asarray( calc_list, dtype=float ).reshape( -1, 3 )
+            for change_version, x_from, x_to, y_max in self.model.changes_since( version[ ~redo ].min() ):
+                redo |= ( version < change_version ) & self.circles_reaching( circles, x_from, x_to, y_max )
+
+        self.fs_manager.remove_fs( [ key for key, r in zip( keys, redo ) if r ] )
+        return [ c for c, r in zip( calc_list, redo ) if r ]
+
+
+    def circles_reaching( self, circles, x_from, x_to, y_max ):
+        ''' circles ( n, 3 ) with their lower arc below y_max somewhere within x_from - x_to '''
+        x_c, y_c, r = circles[:, 0], circles[:, 1], circles[:, 2]
+        x_lo = np.maximum( x_from, x_c-r )
+        x_hi = np.minimum( x_to, x_c+r )
+        x_near = np.clip( x_c, x_lo, x_hi ) # lowest point of the arc within the range
+        y_low = y_c - np.sqrt( np.maximum( r**2-(x_near-x_c)**2, 0 ) )
+        return ( x_lo <= x_hi ) & ( y_low < y_max )
+
+
+    def new_prune_counts( self ):
+        return { 'no_terrain': 0, 'rock': 0, 'shallow': 0, 'fs_bound': 0 }
+
+
+    def adaptive_search( self, search_field=None, increments=None, levels=3, n_best=3, clear_FS=False, workers=None ):
+        ''' coarse grid search, followed by finer grids around the n_best lowest FS circles of the previous levels.
+            each sub grid spans ± one previous grid spacing around a candidate (center and tangent depth), with at least
+            5 points per axis so the spacing is at least halved per level.
+            returns a report with circles evaluated per level and the size of a dense grid with the final spacing.
+        '''
+        if clear_FS:
+            self.clear_fs()
+
+        field = self.get_search_field( search_field )
+        n_x, n_y, n_r = self.get_increments( increments )
+        incr = { 'n_x': n_x, 'n_y': n_y, 'n_r': n_r }
+        n_sub = [ max( n, 5 ) for n in ( n_x, n_y, n_r ) ] # sub grid points, spacing 2*d/(n_sub-1) <= d/2
+        sub_incr = { 'n_x': n_sub[0], 'n_y': n_sub[1], 'n_r': n_sub[2] }
+
+        d_x = (field['x_to']-field['x_from']) / (n_x-1)
+        d_y = (field['y_to']-field['y_from']) / (n_y-1)
+        d_t = (field['upper_tangent']-field['lower_tangent']) / (n_r-1)
+
+        evaluated = {}
+        report = { 'levels': [] }
+        calc_list, grid = self.grid_calc_list( field, incr )
+
+        for level in range( levels ):
+            if level > 0: # refine around best candidates
+                calc_list = []
+                for x_c, y_c, r in self.lowest_fs_circles( evaluated, n_best ):
+                    t_c = y_c - r
+                    sub_field = {
+                        'x_from': max( field['x_from'], x_c-d_x ),
+                        'x_to': min( field['x_to'], x_c+d_x ),
+                        'y_from': max( field['y_from'], y_c-d_y ),
+                        'y_to': min( field['y_to'], y_c+d_y ),
+                        'lower_tangent': max( field['lower_tangent'], t_c-d_t ),
+                        'upper_tangent': min( field['upper_tangent'], t_c+d_t )
+                    }
+                    calc_list += self.grid_calc_list( sub_field, sub_incr )[0]
+
+                d_x, d_y, d_t = 2*d_x/(n_sub[0]-1), 2*d_y/(n_sub[1]-1), 2*d_t/(n_sub[2]-1)
+
+            new_keys = [ key for key in dict.fromkeys( tuple(c) for c in calc_list ) if key not in evaluated ]
+            self.calc_circle_list( [ list(key) for key in new_keys ], workers=workers )
+            evaluated.update( dict.fromkeys( new_keys ) )
+
+            best = self.lowest_fs_circles( evaluated, 1 )
+            report['levels'].append( {
+                'n_circles': len( new_keys ),
+                'fs_min': float( self.fs_manager.get_safety( best[0] ) ) if best else None
+            } )
+
+        self.sort( grid )
+
+        n_dense = 1
+        for extent, d in [ ( field['x_to']-field['x_from'], d_x ), ( field['y_to']-field['y_from'], d_y ), ( field['upper_tangent']-field['lower_tangent'], d_t ) ]:
+            n_dense *= int( round( extent/d ) ) + 1 if d else 1
+
+        critical = self.lowest_fs_circles( evaluated, 1 )
+        report['n_evaluated'] = len( evaluated )
+        report['n_dense'] = n_dense
+        report['critical'] = list( critical[0] ) if critical else None
+        report['fs_min'] = report['levels'][-1]['fs_min']
+        self.search_report = report
+
+        return report
+
+
+    def minimize_fs( self, search_field=None, seeds=None, n_seeds=3, max_eval=200, clear_FS=False ):
+        ''' Nelder-Mead search for the critical circle over ( x_center, y_center, tangent depth ), bounded by search_field.
+            started from each seed [ x_center, y_center, tangent ], by default the n_seeds best circles of a coarse grid.
+            circles without a (valid) failure surface are evaluated as self.no_fs_penalty.
+            returns the critical circle and the evaluation trace [ x_center, y_center, radius, FS or None, seed index ]
+        '''
+        if clear_FS:
+            self.clear_fs()
+
+        field = self.get_search_field( search_field )
+        lower = np.array( [ field['x_from'], field['y_from'], field['lower_tangent'] ], dtype=float )
+        upper = np.array( [ field['x_to'], field['y_to'], field['upper_tangent'] ], dtype=float )
+        scale = np.where( upper > lower, upper-lower, 1 )
+
+        if seeds is None:
+            calc_list = self.grid_calc_list( field, { 'n_x': 4, 'n_y': 4, 'n_r': 3 } )[0]
+            self.calc_circles( calc_list )
+            seeds = [ [ x_c, y_c, y_c-r ] for x_c, y_c, r in self.lowest_fs_circles( [ tuple(c) for c in calc_list ], n_seeds ) ]
+            if not seeds: # no failure surfaces found on coarse grid, start from center of field
+                seeds = [ list( (lower+upper)/2 ) ]
+
+        trace = []
+        def objective( v, seed_index ):
+            x_c, y_c, t_c = [ float(v_i) for v_i in lower + v*scale ]
+            F = self.eval_circle( x_c, y_c, y_c-t_c )
+            trace.append( [ x_c, y_c, y_c-t_c, F, seed_index ] )
+            return self.no_fs_penalty if F is None else F
+
+        for seed_index, seed in enumerate( seeds ):
+            v_0 = np.clip( ( np.array( seed, dtype=float )-lower ) / scale, 0, 1 )
+            minimize( objective, v_0, args=( seed_index, ), method='Nelder-Mead', bounds=[ (0, 1) ]*3,
+                      options={ 'maxfev': max_eval, 'xatol': 1e-4, 'fatol': 1e-5, 'initial_simplex': self.initial_simplex( v_0 ) } )
+
+        grid = {
+            'x': [ field['x_from'], field['x_to'], field['x_to'], field['x_from'], field['x_from'] ],
+            'y': [ field['y_from'], field['y_from'], field['y_to'], field['y_to'], field['y_from'] ]
+        }
+        self.sort( grid )
+
+        valid = [ t for t in trace if t[3] is not None ]
+        best = min( valid, key=lambda t: t[3] ) if valid else None
+        return {
+            'critical': best[:3] if best else None,
+            'fs_min': best[3] if best else None,
+            'n_evaluations': len( trace ),
+            'seeds': seeds,
+            'trace': trace
+        }
+
+
+    def initial_simplex( self, v_0, step=0.1 ):
+        ''' simplex in normalized coordinates, steps point into the unit box '''
+        simplex = [ v_0 ]
+        for i in range( len(v_0) ):
+            v = v_0.copy()
+            v[i] += step if v[i]+step <= 1 else -step
+            simplex.append( v )
+        return np.array( simplex )
+
+
+    def eval_circle( self, x_center, y_center, radius ):
+        ''' FS of a single circle without clearing results, None if it gives no valid failure surface '''
+        if radius <= 0:
+            return None
+
+        self.calc_circles( [ [x_center, y_center, radius] ] )
+        F = self.fs_manager.get_safety( self.fs_manager.gen_fs_key( x_center, y_center, radius ) )
+        if F is None or not ( F > 0 ) or not np.isfinite( F ): # missing, negative or NaN
+            return None
+        return float( F )
+
+
+    def lowest_fs_circles( self, keys, n ):
+        ''' n circle keys with lowest FS, circles without failure surface or valid FS are skipped ( as result_store.rank_key ) '''
+        scored = []
+        for key in keys:
+            F = self.fs_manager.get_safety( key )
+            if F is not None and 0 < F < np.inf: # not None/NaN/non-positive/inf
+                scored.append( ( F, key ) )
+        return [ key for _, key in sorted( scored )[:n] ]
+
+
+    def get_search_field( self, search_field=None ):
+        return {
+            'x_from': search_field[ 'x_from' ] if search_field else 0,
+            'y_from': search_field[ 'y_from' ] if search_field else 10,
+            'x_to': search_field[ 'x_to' ] if search_field else 10,
+            'y_to': search_field[ 'y_to' ] if search_field else 20,
+            'upper_tangent': search_field[ 'upper_tangent' ] if search_field else 0,
+            'lower_tangent': search_field[ 'lower_tangent' ] if search_field else -10
+        }
+
+
+    def get_increments( self, increments=None ):
         n_x = max( increments[ 'n_x' ], 2 ) if increments else self.def_incr
         n_y = max( increments[ 'n_y' ], 2 ) if increments else self.def_incr
         n_r = max( increments[ 'n_r' ], 2 ) if increments else self.def_incr
+        return n_x, n_y, n_r
+
+
+    def grid_calc_list( self, search_field=None, increments=None ):
+        field = self.get_search_field( search_field )
+        x_from, y_from, x_to, y_to = field['x_from'], field['y_from'], field['x_to'], field['y_to']
+
+        calc_list = list( self.grid_circles( field, increments ) )
+
+        grid = { 
+            'x': [ x_from, x_to, x_to, x_from, x_from ], 
+            'y': [ y_from, y_from, y_to, y_to, y_from ]
+        }
+
+        return calc_list, grid
+
+
+    def grid_circles( self, search_field=None, increments=None ):
+        ''' grid circles [ x_center, y_center, radius ] one at a time '''
+        # set grid
+        field = self.get_search_field( search_field )
+        x_from, y_from, x_to, y_to = field['x_from'], field['y_from'], field['x_to'], field['y_to']
+        upper_tangent, lower_tangent = field['upper_tangent'], field['lower_tangent']
+
+        # set increments
+        n_x, n_y, n_r = self.get_increments( increments )
 
         x_incr = (x_to-x_from) / (n_x-1)
         y_incr = (y_to-y_from) / (n_y-1)
         t_incr = (upper_tangent-lower_tangent) / (n_r-1)
 
-        calc_list = []
-
-        for i in range( n_x ): # prints progression
+        for i in range( n_x ):
             x_center = x_from + i*x_incr
             for j in range( n_y ):
                 y_center = y_from + j*y_incr
                 for k in range( n_r ):
                     radius = y_center - (lower_tangent + k*t_incr)
-                    
-                    calc_list.append( [ x_center, y_center, radius ] )
 
+                    yield [ x_center, y_center, radius ]
+
+
+    def iter_grid_search( self, search_field=None, increments=None, top_k=10, stop_below=None, workers=None ):
+        ''' streaming grid search: iterate the returned result_stream for ( circle, FS ) as batches are calculated.
+            circles are generated lazily and results are not stored in fs_manager, see result_stream.
+        '''
+        n_x, n_y, n_r = self.get_increments( increments )
+        circles = self.grid_circles( search_field, increments )
+        return sircular_cylindric_fs.result_stream( self, circles, n_x*n_y*n_r, top_k, stop_below, workers )
+
+
+    def stream_batch( self, batch ):
+        ''' ( circle, FS ) of circles with failure surface in batch '''
+        results = []
+        for batch_circles, slices, _ in self.geometry_batches( batch ):
+            if batch_circles:
+                F, _ = self.method.calc_fs( slices, [ c[0] for c in batch_circles ], [ c[2] for c in batch_circles ] )
+                results += [ ( tuple( c ), float( F_i ) ) for c, F_i in zip( batch_circles, F ) ]
+        return results
+
+
+    def calc_circle_list( self, calc_list, workers=None, prune=False ):
+        ''' evaluates circles in batches, optionally on a pool of worker processes.
+            the model is shipped once per worker and results are merged in calc_list order,
+            so the stored failure surfaces are identical to the serial run.
+            with prune, circles are prescreened against the best FS so far ( workers: best FS before the pool started ).
+        '''
+        if workers and workers > 1 and self.cache_geometry:
+            raise ValueError( 'cache_geometry keeps slices of serial runs only, use workers=None' )
+        with tqdm( total=len(calc_list), disable=not self.progress ) as progress: # prints progression
+            if workers and workers > 1:
+                if self.cache is not None: # cached circles are loaded here, not in the workers
+                    calc_list = self.load_cached( calc_list )
+                    progress.update( progress.total-len(calc_list) )
+
+                chunk_size = max( 1, min( self.batch_size, -(-len(calc_list) // (4*workers)) ) ) # ~4 chunks per worker
+                chunks = [ calc_list[ i:i+chunk_size ] for i in range( 0, len(calc_list), chunk_size ) ]
+
+                with ProcessPoolExecutor( max_workers=workers, initializer=pool_init, initargs=( self.model, self.n_lamelle, self.method, self.profile ) ) as pool:
+                    best_fs = self.best_fs() if prune else None
+                    results = pool.map( pool_calc_circles, chunks, [ prune ]*len(chunks), [ best_fs ]*len(chunks) )
+                    for chunk, ( fs_list, prune_counts, stats ) in zip( chunks, results ):
+                        if self.cache is not None:
+                            self.save_cached( chunk, fs_list, prune )
+                        self.fs_manager.merge_fs( fs_list )
+                        self.fs_manager.set_evaluated( chunk, self.model.version )
+                        for reason, count in prune_counts.items():
+                            self.prune_counts[ reason ] += count
+                        if stats:
+                            self.stats.merge( stats )
+                        progress.update( len(chunk) )
+            else:
+                for i in range( 0, len(calc_list), self.batch_size ):
+                    batch = calc_list[ i:i+self.batch_size ]
+                    self.calc_circles( batch, prune=prune, best_fs=self.best_fs() if prune else None )
+                    progress.update( len(batch) )
+
+
+    def best_fs( self ):
+        critical = self.fs_manager.get_critical_fs()
+        return critical['safety'] if critical else None
+
+
+    def compare_methods( self, methods, search_field=None, increments=None, calc_list=None ):
+        ''' FS from several methods ( methods.py ) on one shared geometry pass over a grid ( or calc_list ).
+            results are not stored in fs_manager. returns per method FS/iterations per circle, the critical
+            circle and the time spent in the FS stage, plus the shared geometry time.
+        '''
+        if calc_list is None:
+            calc_list = self.grid_calc_list( search_field, increments )[0]
+
+        circles = []
+        results = { method.name: { 'safety': [], 'iterations': [], 'time': 0.0 } for method in methods }
+        t_geometry = 0.0
+
+        for batch_circles, slices, t_batch in self.geometry_batches( calc_list ):
+            t_geometry += t_batch
+            circles += batch_circles
+            center_x = [ c[0] for c in batch_circles ]
+            radius = [ c[2] for c in batch_circles ]
+            for method in methods:
+                t_0 = time.perf_counter()
+                F, k = method.calc_fs( slices, center_x, radius )
+                results[ method.name ]['time'] += time.perf_counter() - t_0
+                results[ method.name ]['safety'].append( F )
+                results[ method.name ]['iterations'].append( k )
+
+        for res in results.values():
+            res['safety'] = np.concatenate( res['safety'] ) if res['safety'] else np.zeros( 0 )
+            res['iterations'] = np.concatenate( res['iterations'] ) if res['iterations'] else np.zeros( 0, dtype=int )
+            valid = np.where( res['safety'] > 0, res['safety'], np.inf ) # negative/NaN FS are not critical
+            i_min = int( np.argmin( valid ) ) if len( valid ) else None
+            res['critical'] = circles[ i_min ] if i_min is not None and np.isfinite( valid[i_min] ) else None
+            res['fs_min'] = float( valid[ i_min ] ) if res['critical'] else None
+            res['surfaces_per_s'] = len( circles ) / res['time'] if res['time'] else None
+
+        return { 'circles': circles, 'geometry_time': t_geometry, 'methods': results }
+
+
+    def geometry_batches( self, calc_list ):
+        ''' slice batches of calc_list circles ( last failure surface per circle, as in save_fs ), not stored in fs_manager.
+            yields circles with failure surface, their slices and the time spent per batch
+        '''
+        for i in range( 0, len(calc_list), self.batch_size ):
+            t_0 = time.perf_counter()
+            batch = calc_list[ i:i+self.batch_size ]
+            x_lists, y_lists, batch_circles = [], [], []
+            for ( x_center, y_center, radius ), layer_icts in zip( batch, self.calc_icts_batch( batch ) ):
+                fs_x_vals, fs_y_vals = self.circle_surfaces( x_center, y_center, radius, layer_icts )
+                if fs_x_vals:
+                    x_lists.append( fs_x_vals[-1] )
+                    y_lists.append( fs_y_vals[-1] )
+                    batch_circles.append( [ x_center, y_center, radius ] )
+            slices = self.calc_slices( x_lists, y_lists )
+            yield batch_circles, slices, time.perf_counter() - t_0
+
+
+    def monte_carlo( self, distributions, n=1000, gw_shift=None, circle=None, search_field=None, increments=None, calc_list=None, seed=None, workers=None ):
+        ''' probabilistic FS from n realizations of layer parameters and GW level ( distributions from probabilistic.py ).
+            distributions: { layer index: { 'gamma'|'a'|'phi'|'cu': distribution } }, gw_shift: distribution of a vertical GW shift.
+            realizations are evaluated on circle ( default: current critical circle ), or if search_field/increments/calc_list
+            are given, on all circles of that grid taking the lowest FS per realization ( re-searched critical circle ).
+            realizations are evaluated in chunks of one slice array each, chunks are spread on workers if given.
+            returns the FS per realization with its statistics ( probabilistic.summary: mean, std, beta, pf=P(F<1) ).
+        '''
+        t_0 = time.perf_counter()
+        if gw_shift is not None and not self.model.GW:
+            raise ValueError( 'gw_shift needs a GW profile ( model.set_gw )' )
+
+        research = search_field is not None or increments is not None or calc_list is not None
+        if research and calc_list is None:
+            calc_list = self.grid_calc_list( search_field, increments )[0]
+        elif not research:
+            if circle is None:
+                critical = self.fs_manager.get_critical_fs()
+                if critical is None:
+                    raise ValueError( 'no critical circle, run a search first or give a circle' )
+                circle = [ critical['center_x'], critical['center_y'], critical['radius'] ]
+            calc_list = [ list( circle ) ]
+
+        circles, batches = [], []
+        for batch_circles, slices, _ in self.geometry_batches( calc_list ):
+            if batch_circles:
+                circles += batch_circles
+                batches.append( ( slices, [ c[0] for c in batch_circles ], [ c[2] for c in batch_circles ] ) )
+        if not circles:
+            raise ValueError( 'no failure surface for the given circle(s)' )
+
+        # deterministic FS with current layer parameters, geometry shared with the realizations
+        F_det = np.hstack( [ self.method.calc_fs( slices, center_x, radius )[0] for slices, center_x, radius in batches ] )
+
+        rng = np.random.default_rng( seed )
+        params = sample_layer_params( self.model.layers, distributions, n, rng )
+        shift = gw_shift.sample( rng, n ) if gw_shift is not None else None
+
+        # realizations per chunk, limited by slices per array
+        chunk_size = max( 1, self.mc_slices // max( len( slices.x_cen ) for slices, _, _ in batches ) )
+        if workers and workers > 1:
+            chunk_size = max( 1, min( chunk_size, -(-n // (4*workers)) ) ) # ~4 chunks per worker
+        chunks = [ ( { key: values[ :, i:i+chunk_size ] for key, values in params.items() }, None if shift is None else shift[ i:i+chunk_size ] )
+                   for i in range( 0, n, chunk_size ) ]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor( max_workers=workers, initializer=pool_mc_init, initargs=( batches, self.method ) ) as pool:
+                F_chunks = list( tqdm( pool.map( pool_mc_fs, *zip( *chunks ) ), total=len(chunks), disable=not self.progress ) )
+        else:
+            F_chunks = [ mc_fs( batches, self.method, *chunk ) for chunk in tqdm( chunks, disable=not self.progress ) ]
 
-        for i in tqdm( range( len(calc_list) ) ): # prints progression
-            c=calc_list[i]
-            self.calc_single_circle( c[0], c[1], c[2], clear_FS=False )
+        F_all = np.vstack( F_chunks ) # ( n, n_circles )
+        valid = np.where( F_all > 0, F_all, np.inf ) # negative/NaN FS are not critical
+        critical_index = np.argmin( valid, axis=1 )
+        F = valid[ np.arange( n ), critical_index ]
+        F[ np.isinf( F ) ] = np.nan
 
-        grid = { 
-            'x': [ x_from, x_to, x_to, x_from, x_from ], 
-            'y': [ y_from, y_from, y_to, y_to, y_from ]
-        }
+        report = summary( F )
+        report['fs'] = F
+        report['fs_deterministic'] = float( np.min( np.where( F_det > 0, F_det, np.inf ) ) )
+        report['circles'] = circles
+        report['critical_index'] = critical_index # circle of lowest FS per realization
+        report['samples'] = params
+        report['gw_shift'] = shift
+        report['time'] = time.perf_counter() - t_0
+        report['realizations_per_s'] = n / report['time']
+        self.mc_report = report
 
-        self.sort( grid )
+        return report
 
 
     def calc_single_circle( self, x_center, y_center, radius, clear_FS=True ):
         if clear_FS:
-            self.fs_manager.clear_fs()
+            self.clear_fs()
         
-        self.calc_circle( x_center, y_center, radius )
-        fs_id = self.fs_manager.gen_fs_key(x_center, y_center, radius)
-        self.populate_lamellas( fs_id )
-        self.calc_factor_of_safety( fs_id )
+        self.calc_circles( [ [x_center, y_center, radius] ] )
+
+
+    def calc_circles( self, calc_list, prune=False, best_fs=None ):
+        ''' geometry per circle, then slices for all resulting failure surfaces in one batch.
+            with prune, circles rejected by prescreen are skipped. with a cache, cached circles are loaded instead.
+        '''
+        stats = self.stats if self.profile else None
+        t = time.perf_counter() if stats else None
+        if self.cache is not None:
+            n_circles = len( calc_list )
+            calc_list = self.load_cached( calc_list )
+            if stats:
+                stats.count( 'circles_cached', n_circles-len(calc_list) )
+                t = stats.lap( 'cache', t )
+
+        fs_ids = {}
+        batch_icts = self.calc_icts_batch( calc_list )
+        if stats:
+            t = stats.lap( 'calc_icts', t )
+        keep = self.prescreen( calc_list, batch_icts, best_fs ) if prune else np.ones( len(calc_list), dtype=bool )
+        if stats and prune:
+            t = stats.lap( 'prescreen', t )
+
+        for ( x_center, y_center, radius ), layer_icts, keep_circle in zip( calc_list, batch_icts, keep ):
+            if not keep_circle:
+                continue
+            self.calc_circle( x_center, y_center, radius, layer_icts )
+            fs_id = self.fs_manager.gen_fs_key( x_center, y_center, radius )
+            if fs_id in self.fs_manager.fs: # circles not cutting terrain give no failure surface
+                fs_ids[ fs_id ] = None
+
+        t = time.perf_counter() if stats else None
+        self.populate_slices( fs_ids )
+        if stats:
+            t = stats.lap( 'slices', t )
+        self.calc_factor_of_safety( fs_ids )
+        if stats:
+            t = stats.lap( 'calc_fs', t )
+
+        if self.cache is not None:
+            self.save_cached( calc_list, [ self.fs_manager.fs[ fs_id ] for fs_id in fs_ids ], prune )
+            if stats:
+                t = stats.lap( 'cache', t )
+
+        self.fs_manager.commit( fs_ids )
+        self.fs_manager.set_evaluated( calc_list, self.model.version )
+        if stats:
+            stats.lap( 'commit', t )
+            stats.count( 'circles_calculated', int( np.sum( keep ) ) )
+            stats.count( 'circles_pruned', int( np.sum( ~keep ) ) )
+            stats.count( 'failure_surfaces', len( fs_ids ) )
+
+
+    def analysis_key( self ):
+        ''' content hash of model and calculation settings, key of cached results '''
+        h = hashlib.sha256( self.model.content_hash().encode() )
+        h.update( repr( ( self.cache.version, self.n_lamelle, self.method.name, self.method.eps, self.method.max_it ) ).encode() )
+        return h.hexdigest()
+
+
+    def load_cached( self, calc_list ):
+        ''' loads cached circles into fs_manager, returns the circles to calculate '''
+        if not calc_list:
+            return calc_list
+        found = self.cache.get( self.analysis_key(), calc_list )
+        self.fs_manager.merge_fs( [ fs for fs in found.values() if fs is not None ] )
+        self.fs_manager.set_evaluated( [ calc_list[i] for i in found ], self.model.version )
+        return [ circle for i, circle in enumerate( calc_list ) if i not in found ]
+
+
+    def save_cached( self, calc_list, fs_list, prune=False ):
+        ''' stores calculated fs dicts, circles without failure surface only if none were pruned '''
+        keys = { self.fs_manager.gen_fs_key( fs['center_x'], fs['center_y'], fs['radius'] ) for fs in fs_list }
+        no_fs = [] if prune else [ circle for circle in calc_list if self.fs_manager.gen_fs_key( *circle ) not in keys ]
+        self.cache.put( self.analysis_key(), fs_list, no_fs )
+
+
+    def prescreen( self, calc_list, batch_icts, best_fs=None ):
+        ''' cheap checks before failure surface/slice construction, returns a keep mask for calc_list.
+            pruned circles ( counted in prune_counts ):
+                no_terrain: less than two terrain intersections, no failure surface
+                rock: circle below the rock surface ( model.rock ) between its terrain intersections
+                shallow: cut depth below min_cut_depth
+                fs_bound: undrained models, moment equilibrium methods. lower bound FS = r*cu_min*chord / M_max,
+                    M_max = gamma_max * integral of soil height times positive lever arm, pruned if above prune_factor*best_fs
+        '''
+        keep = np.ones( len(calc_list), dtype=bool )
+        terrain_icts = [ layer_icts[0][1][0] for layer_icts in batch_icts ]
+        n_icts = np.array( [ len( x ) for x in terrain_icts ] )
+
+        keep[ n_icts < 2 ] = False
+        self.prune_counts['no_terrain'] += int( np.sum( n_icts < 2 ) )
+
+        rows = np.flatnonzero( keep )
+        if len( rows ) == 0:
+            return keep
+
+        circles = np.asarray( calc_list, dtype=float ).reshape( -1, 3 )[ rows ]
+        x_c, y_c, r = circles[:, 0:1], circles[:, 1:2], circles[:, 2:3]
+        x_a = np.array( [ min( terrain_icts[i] ) for i in rows ] )[:, None]
+        x_b = np.array( [ max( terrain_icts[i] ) for i in rows ] )[:, None]
+
+        # sample points between first and last terrain intersection, plus the circle bottom
+        t = np.linspace( 0, 1, self.n_prescreen )
+        x_s = np.hstack( ( x_a + t*(x_b-x_a), np.clip( x_c, x_a, x_b ) ) )
+        y_circ = y_c - np.sqrt( np.maximum( r**2-(x_s-x_c)**2, 0 ) )
+        h = self.model.layers[0].y_from_x( x_s ) - y_circ # soil height above circle
+
+        pruned = np.zeros( len(rows), dtype=bool )
+        if self.model.rock:
+            in_rock = ( y_circ < self.model.rock.y_from_x( x_s ) ).any( axis=1 )
+            self.prune_counts['rock'] += int( np.sum( in_rock ) )
+            pruned |= in_rock
+
+        if self.min_cut_depth > 0:
+            shallow = ~pruned & ( h.max( axis=1 ) < self.min_cut_depth )
+            self.prune_counts['shallow'] += int( np.sum( shallow ) )
+            pruned |= shallow
+
+        layers = self.model.layers
+        if best_fs is not None and best_fs > 0 and self.method.moment_equilibrium and all( layer.undrained for layer in layers ):
+            n = self.n_prescreen
+            single = n_icts[ rows ] == 2 # arc between two icts is all in soil
+            moment = np.maximum( h[:, :n], 0 ) * np.maximum( x_s[:, :n]-x_c, 0 ) # trapezoidal integration
+            m_max = max( layer.gamma for layer in layers ) * np.sum( ( moment[:, 1:]+moment[:, :-1] ) / 2 * np.diff( x_s[:, :n] ), axis=1 )
+            chord = np.hypot( x_b-x_a, y_circ[:, n-1:n]-y_circ[:, :1] )[:, 0] # sum of slice bases >= chord
+            with np.errstate( divide='ignore', invalid='ignore' ):
+                fs_min = r[:, 0] * min( layer.cu for layer in layers ) * chord / m_max
+            bound = ~pruned & single & ( m_max > 0 ) & ( fs_min > self.prune_factor*best_fs )
+            self.prune_counts['fs_bound'] += int( np.sum( bound ) )
+            pruned |= bound
+
+        keep[ rows[ pruned ] ] = False
+        return keep
+
+
+    def calc_factor_of_safety( self, fs_ids ):
+        fs_list = [ self.fs_manager.fs[ fs_id ] for fs_id in fs_ids ]
+        if fs_list:
+            self.calc_fs( fs_list, self.batch_slices )
+        if self.fs_manager.keep_details is not None: # lean mode: the batch is not held
+            self.batch_slices = None
+
+
+    def calc_fs( self, fs_list, slices=None ):
+        ''' factor of safety for a failure surface ( fs dict ) or a list of them sharing one slice batch '''
+        if isinstance( fs_list, dict ):
+            fs_list = [ fs_list ]
+        if slices is None:
+            slices = fs_list[0]['slices']
+
+        F, k = self.method.calc_fs( slices, [ fs['center_x'] for fs in fs_list ], [ fs['radius'] for fs in fs_list ] )
+        for j, fs in enumerate( fs_list ):
+            fs['safety'] = F[j]
+            fs['iterations'] = int( k[j] )
+        if self.profile and len( k ):
+            self.stats.count( 'iterations', int( np.sum( k ) ) )
+            self.stats.count_max( 'iterations_max', int( np.max( k ) ) )
+
+
+    def populate_slices( self, fs_ids ):
+        fs_list = [ self.fs_manager.fs[ fs_id ] for fs_id in fs_ids ]
+        slices = self.calc_slices( [ fs['x'] for fs in fs_list ], [ fs['y'] for fs in fs_list ] )
+        undrained = slices.surface_undrained()
+
+        for j, fs in enumerate( fs_list ):
+            fs['slices'] = slices.get_surface( j ) if len( fs_list ) > 1 else slices
+            fs['undrained'] = bool( undrained[j] )
+            fs['lamellas'] = None # object view, built on demand
+
+        self.batch_slices = slices
+
+        if self.cache_geometry:
+            if self.geometry_version != self.model.geometry_version: # layer geometry changed, old slices invalid
+                self.geometry = []
+                self.geometry_version = self.model.geometry_version
+            self.geometry.append( [ list( fs_ids ), slices ] )
+
+
+    def recalc_fs( self ):
+        ''' FS of all calculated circles after changes of LAYER gamma, a, phi, cu, undrained or the GW.
+            for circles with cached slices ( cache_geometry ) only soil weights, pore pressures, base strengths and FS
+            are recalculated. other circles ( FS cache hits ), or all circles if layer geometry changed or no slices
+            were cached, are recalculated from scratch.
+        '''
+        if self.geometry_version != self.model.geometry_version:
+            calc_list = list( self.fs_manager.evaluated ) or self.fs_manager.store.keys[ :self.fs_manager.store.n ]
+            self.clear_fs()
+            self.calc_circle_list( [ list( key ) for key in calc_list ] )
+        else:
+            located = {}
+            for fs_ids, slices in self.geometry:
+                slices.calc_soils()
+                F, k = self.method.calc_fs( slices, [ key[0] for key in fs_ids ], [ key[2] for key in fs_ids ] )
+                undrained = slices.surface_undrained()
 
+                for j, key in enumerate( fs_ids ):
+                    located[ key ] = ( slices, j )
+                    self.fs_manager.update_result( key, F[j], bool( undrained[j] ), int( k[j] ) )
+                    if key in self.fs_manager.fs:
+                        self.fs_manager.fs[ key ]['slices'] = slices.get_surface( j )
+                        self.fs_manager.fs[ key ]['lamellas'] = None
 
-    def calc_factor_of_safety( self, fs_id ):
-        fs = self.fs_manager.fs[ fs_id ]
-        self.calc_fs( fs )
+            if self.fs_manager.keep_details is not None: # lean mode: new critical surfaces need their fs dicts
+                for row in self.fs_manager.store.top_k( self.fs_manager.keep_details ):
+                    key = self.fs_manager.store.keys[ row ]
+                    if key not in self.fs_manager.fs and key in located:
+                        self.restore_fs( key, *located[ key ] )
+                self.fs_manager.prune_details()
 
+            store = self.fs_manager.store
+            uncached = [ list( key ) for key in store.keys[ :store.n ] if key not in located ]
+            if uncached:
+                self.calc_circle_list( uncached )
 
-    def calc_fs( self, fs ):
-        eps = 0.0001
-        max_it = 100
-        k = 0
-        F_k = 1 # iterate this one
-        F_temp = 0
+        if self.fs_manager.ranking is not None:
+            self.sort( self.fs_manager.grid )
 
 
-        while abs(F_k-F_temp) > eps:
-            F_temp = F_k # last iteration
-            sum_Q_e = 0 # no implemented
-            sum_Wi_x_ti = 0 # also called p*delta_x*x_t
-            sum_T = 0 # shear force
+    def restore_fs( self, key, slices, j ):
+        ''' fs dict of surface j in a cached slice batch '''
+        surface = slices.get_surface( j )
+        row = self.fs_manager.store.index[ key ]
+        self.fs_manager.add_fs( key[0], key[1], key[2], surface.x_nodes[0], [ surface.x_nodes.tolist(), surface.y_nodes.tolist() ] )
 
-            lamellas = fs['lamellas'].lamellas
-            for i in range( len(lamellas) ):
-                lamelle = lamellas[i]
-                sum_T += lamelle.get_shear_force( F_k )
-                sum_Q_e += 0
-                sum_Wi_x_ti += lamelle.weight * (lamelle.x_m_cen-fs['center_x'])
+        fs = self.fs_manager.fs[ key ]
+        fs['slices'] = surface
+        fs['safety'] = self.fs_manager.store.safety[ row ]
+        fs['undrained'] = bool( self.fs_manager.store.flags[ row ] & self.fs_manager.store.UNDRAINED )
 
-            F_k = ( fs['radius'] * sum_T ) / ( sum_Q_e + sum_Wi_x_ti )
 
-            k += 1
-            if k > max_it:
-                break
-        
-        fs['safety'] = F_k
+    def calc_slices( self, x_lists, y_lists ):
+        return lam_arrays( self.model, x_lists, y_lists )
+
 
-        if False:
-            print('sum_T: ' + str(round(sum_T,3)))
-            print('sum_Qe: ' + str(round(sum_Q_e,3)))
-            print('sum_wtxi: ' + str(round(sum_Wi_x_ti,3)))
+    def get_fs_xy( self, fs ):
+        ''' failure surface coordinates, arcs of summary-only (lean) results are recalculated for plotting '''
+        if 'x' in fs:
+            return fs['x'], fs['y']
 
+        x = np.linspace( fs['start_x'], fs['end_x'], self.n_lamelle+1 )
+        return x, self.calc_circle_y_from_x( x, fs['center_x'], fs['center_y'], fs['radius'] )
 
-    def populate_lamellas( self, fs_id ):
-        fs = self.fs_manager.fs[ fs_id ]
+
+    def get_lamellas( self, fs ):
+        ''' lamelle objects of a failure surface (print_geom/plotting) '''
+        if fs.get( 'lamellas' ) is None:
+            self.populate_lamellas( fs )
+        return fs['lamellas']
+
+
+    def populate_lamellas( self, fs ):
         lamellas, undrained = self.calc_lamellas( fs['x'], fs['y'] )
         fs['lamellas'] = lamellas
         fs['undrained'] = undrained
@@ -154,22 +798,46 @@ class sircular_cylindric_fs():
         return [lamellas, undrained]
 
 
-    def calc_circle( self, x_center, y_center, radius ):
+    def calc_circle( self, x_center, y_center, radius, layer_icts=None ):
+        fs_x_vals, fs_y_vals = self.circle_surfaces( x_center, y_center, radius, layer_icts )
+
+        # save all FS
+        if self.profile:
+            t = time.perf_counter()
+        self.save_fs( fs_x_vals, fs_y_vals, x_center, y_center, radius )
+        if self.profile:
+            self.stats.lap( 'save_fs', t )
+
+
+    def circle_surfaces( self, x_center, y_center, radius, layer_icts=None ):
+        ''' failure surface geometry of a circle: x and y lists for each failure surface '''
         # get all layer intersections with circle
-        layer_icts = self.calc_icts( x_center, y_center, radius ) # calc all circle-layer intersects
+        stats = self.stats if self.profile else None
+        t = time.perf_counter() if stats else None
+        if layer_icts is None:
+            layer_icts = self.calc_icts( x_center, y_center, radius ) # calc all circle-layer intersects
+            if stats:
+                t = stats.lap( 'calc_icts', t )
 
         # separate icts by failure surfaces (FS)
         raw_failure_surfaces = self.filter_icts( layer_icts, x_center, y_center, radius ) # find circle intervals penetrating soil, delete icts outside intervals
+        if stats:
+            t = stats.lap( 'filter_icts', t )
 
         # get all layer breakpoints within FS
         raw_fs_x_vals = self.add_intermediate_points( raw_failure_surfaces )
+        if stats:
+            t = stats.lap( 'add_intermediate_points', t )
 
         # calc additional lamelle points
         fs_x_vals = self.add_add_extra_points( raw_fs_x_vals, raw_failure_surfaces, x_center, y_center, radius )
+        if stats:
+            t = stats.lap( 'add_add_extra_points', t )
         fs_y_vals = self.calc_fs_y_vals( fs_x_vals, x_center, y_center, radius )
+        if stats:
+            stats.lap( 'calc_fs_y_vals', t )
 
-        # save all FS
-        self.save_fs( fs_x_vals, fs_y_vals, x_center, y_center, radius )
+        return fs_x_vals, fs_y_vals
 
 
     def save_fs( self, x_vals, y_vals, x_cen, y_cen, r ):
@@ -232,33 +900,27 @@ class sircular_cylindric_fs():
         return arccos(cos_theta)
 
 
-###############################
-# does not work like intended #
-###############################################################################################################
-    def add_intermediate_points( self, raw_fs_es ): 
-        tmp_fs = copy.deepcopy(raw_fs_es)
-        for i in range( len(tmp_fs) ): # failure surface
+    def add_intermediate_points( self, raw_fs_es ):
+        fs_x_vals = []
+        for raw_fs in raw_fs_es: # failure surface
             tmp_x_list = []
-            for j in range(len(tmp_fs[i])): # layer
-                layer_x_vals = self.model.layers[ tmp_fs[i][j][0] ].x
+            for layer_index, ict_x, ict_y in raw_fs: # layer
+                layer = self.model.layers[ layer_index ]
+                layer_x_vals = layer.x
 
-                tmp_x_list = []
+                for half_index in range( len(ict_x)//2 ): # each dip into layer
+                    x_from = ict_x[2*half_index]
+                    x_to = ict_x[2*half_index+1]
+                    idx = layer.indexes_between( x_from, x_to )
 
-                for half_index in range( len(tmp_fs[i][j][1])//2 ): # each dip into layer
-                    x_from = tmp_fs[i][j][1][2*half_index]
-                    x_to = tmp_fs[i][j][1][2*half_index+1]
-                    idx = self.indexes_between_xcoords( layer_x_vals, x_from, x_to, False )
-                    
                     tmp_x_list.append( x_from )
                     if idx: # add intermediate points
                         tmp_x_list += [layer_x_vals[k] for k in idx]
                     tmp_x_list.append( x_to )
 
-            tmp_fs[i][j] = tmp_x_list # return x_vals
-            
-        return tmp_fs[0] ############ check for multiple FS
-###############################################################################################################
+            fs_x_vals.append( sorted( set(tmp_x_list) ) ) # breakpoints from all layers, one list per FS
 
+        return fs_x_vals
 
 
     def filter_icts( self, layer_icts, x_center, y_center, radius ):
@@ -289,7 +951,7 @@ class sircular_cylindric_fs():
 
     def circle_penetrating_terrain( self, terrain, x_1, y_1, x_2, y_2, x_center, y_center, radius ):
         # find "surface point" on terrain between ict points (from list or coordinate midpoint)
-        indexes = self.indexes_between_xcoords( terrain.x, x_1, x_2 )
+        indexes = terrain.indexes_between( x_1, x_2 )
         if indexes:
             xs_1 = terrain.x[indexes[0]]
             ys_1 = terrain.y[indexes[0]]
@@ -316,126 +978,247 @@ class sircular_cylindric_fs():
 
 
     def calc_icts( self, x_center, y_center, radius ):
-        lay_icts = []
-        i = 0
+        return self.calc_icts_batch( [ [x_center, y_center, radius] ] )[0]
 
-        for layer in self.model.layers:
-            intersects = self.all_circle_intersects( layer, x_center, y_center, radius )
-            lay_icts.append( [i, intersects] )
-            i += 1
 
-        return lay_icts
+    def calc_icts_batch( self, calc_list ):
+        ''' circle-layer intersects for a batch of circles [ [x_cen, y_cen, r], ... ], one lay_icts list per circle '''
+        n_layers = len( self.model.layers )
+        seg_layer, x_1, y_1, x_2, y_2 = self.layer_segments()
+        circles = np.asarray( calc_list, dtype=float ).reshape( -1, 3 )
 
+        xs, ys, ict = self.batch_circle_intersects( x_1, y_1, x_2, y_2, circles[:, 0:1], circles[:, 1:2], circles[:, 2:3] )
 
-    def all_circle_intersects( self, terrain, x_cen, y_cen, r ):
-        xs = []
-        ys = []
-        for i in range( len( terrain.x ) - 1 ):
-            intersects, xsi, ysi = self.calc_intersects( terrain.x[i], terrain.y[i], terrain.x[i+1], terrain.y[i+1], x_cen, y_cen, r )
-            if intersects:
-                for x, y in zip( xsi, ysi ):
-                    xs.append( x )
-                    ys.append( y )
+        # intersects ordered by circle, segment, root -> split by circle and layer
+        i_circ, i_seg, i_root = np.nonzero( ict )
+        keys = i_circ*n_layers + seg_layer[ i_seg ]
+        bounds = np.searchsorted( keys, np.arange( len(circles)*n_layers + 1 ) )
+        x_found = xs[ i_circ, i_seg, i_root ].tolist()
+        y_found = ys[ i_circ, i_seg, i_root ].tolist()
 
-        return [ xs, ys ]
+        batch_icts = []
+        for c in range( len(circles) ):
+            lay_icts = []
+            for i in range( n_layers ):
+                k = c*n_layers + i
+                lay_icts.append( [ i, [ x_found[ bounds[k]:bounds[k+1] ], y_found[ bounds[k]:bounds[k+1] ] ] ] )
+            batch_icts.append( lay_icts )
 
+        return batch_icts
 
-    def calc_intersects(self, x_1, y_1, x_2, y_2, x_cen, y_cen, r):
-        """Calculates intersect between 
-               - a line defined by two points (x_1,y_1) and (x_2, y_2) and 
-               - a circle defined by a center point (x_cen,y_cen) with a radius r
 
-               formula solved is:
-               M * ( x-x_1 ) + y_1 = ( r^2 - (x-x_cen)^2 ) + y_cen
-               where M = ( y_2-y_1 ) / ( x_2-x_1 )
+    def layer_segments( self ):
+        ''' all layer polylines as segment arrays, with layer index per segment '''
+        seg_layer, x_1, y_1, x_2, y_2 = [], [], [], [], []
+        for i, layer in enumerate( self.model.layers ):
+            x = np.asarray( layer.x, dtype=float )
+            y = np.asarray( layer.y, dtype=float )
+            seg_layer.append( np.full( len(x)-1, i ) )
+            x_1.append( x[:-1] )
+            y_1.append( y[:-1] )
+            x_2.append( x[1:] )
+            y_2.append( y[1:] )
 
-               returns intersects within line segment: (x_1,y_1) - (x_2,y_2)
-        """
+        return [ np.concatenate( v ) for v in [ seg_layer, x_1, y_1, x_2, y_2 ] ]
 
-        xsi = [] # init empty temp vars
-        ysi = []
-
-        if x_2 == x_1: # vertical segment
-            if x_1 >= x_cen-r and x_1 <= x_cen+r: # within radius of circle
-                if x_1 == x_cen-r: # double root
-                    xsi = [ x_1, x_1 ]
-                    ysi = [ y_cen, y_cen ]
-                elif x_1 == x_cen+r: # double root
-                    xsi = [ x_1, x_1 ]
-                    ysi = [ y_cen, y_cen ]
-                else:
-                    xsi = [ x_1, x_1 ]
-                    ysi = [ y_cen - (r**2-(x_1-x_cen)**2)**0.5, y_cen + (r**2-(x_1-x_cen)**2)**0.5 ]
+
+    def batch_circle_intersects( self, x_1, y_1, x_2, y_2, x_cen, y_cen, r ):
+        """Circle-line intersects, line segments (x_1,y_1) - (x_2,y_2) are
+           broadcast against circles (x_cen, y_cen, r), e.g. segments of shape (n_seg,)
+           and circles of shape (n_circles, 1).
+
+           returns xs, ys of shape (..., 2) with both roots per segment and circle,
+           and a mask of the roots within the line segments
+        """
+        vertical = x_2 == x_1
+        with np.errstate( divide='ignore', invalid='ignore' ):
+            M = np.where( vertical, 0, ( y_2-y_1 ) / ( x_2-x_1 ) )
+
+        # sloped segments, a double root gives two identical points
+        a = ( 1 + M**2 ) # never 0!
+        b = 2 * ( y_1*M - x_1*M*M - y_cen*M - x_cen )
+        c = ( (x_1*M)**2 + y_1**2 + y_cen**2 + x_cen**2 - r**2 ) + 2*( M*( x_1*y_cen - x_1*y_1 ) - y_1*y_cen )
+        disc = b**2-4*a*c
+        sqrt_disc = np.sqrt( np.maximum( disc, 0 ) )
+
+        rx = np.stack( np.broadcast_arrays( ( -b - sqrt_disc ) / ( 2*a ), ( -b + sqrt_disc ) / ( 2*a ) ), axis=-1 )
+        ry = M[..., None] * ( rx-x_1[..., None] ) + y_1[..., None]
+
+        # vertical segments, double root where x_1 == x_cen ± r
+        dy = np.sqrt( np.maximum( r**2-(x_1-x_cen)**2, 0 ) )
+        dy = np.where( ( x_1 == x_cen-r ) | ( x_1 == x_cen+r ), 0, dy )
+        vx = np.broadcast_to( x_1[..., None], rx.shape )
+        vy = np.stack( np.broadcast_arrays( y_cen - dy, y_cen + dy ), axis=-1 )
+        v_real = ( x_1 >= x_cen-r ) & ( x_1 <= x_cen+r )
+
+        xs = np.where( vertical[..., None], vx, rx )
+        ys = np.where( vertical[..., None], vy, ry )
+        real = np.where( vertical, v_real, disc >= 0 )
+
+        # filter out icts within point range
+        y_low = np.minimum( y_1, y_2 )[..., None]
+        y_high = np.maximum( y_1, y_2 )[..., None]
+        ict = real[..., None] & ( xs >= x_1[..., None] ) & ( xs <= x_2[..., None] ) & ( ys >= y_low ) & ( ys <= y_high )
+
+        return xs, ys, ict
+
+
+
+
+    class result_stream():
+        ''' ( circle, FS ) results of a circle iterator, calculated in batches of batch_size circles.
+            keeps a bounded running top-K of the lowest FS ( top() ), circles without failure surface are skipped.
+            with stop_below the stream ends after the first positive FS below that threshold ( stopped is set ).
+            with workers, at most 2 batches per worker are in flight, so the circle iterator is never materialized.
+        '''
+        def __init__( self, fs_calc, circles, n_total=None, top_k=10, stop_below=None, workers=None ):
+            self.fs_calc = fs_calc
+            self.circles = circles
+            self.n_total = n_total # for progress, if known
+            self.top_k = top_k
+            self.stop_below = stop_below
+            self.workers = workers
+
+            self.n_evaluated = 0 # circles calculated, with or without failure surface
+            self.n_results = 0 # results yielded
+            self.stopped = False
+            self.heap = [] # ( -FS, circle ), largest of the kept FS on top
+
+
+        def __iter__( self ):
+            batches = iter( lambda: list( islice( self.circles, self.fs_calc.batch_size ) ), [] )
+
+            if self.workers and self.workers > 1:
+                model, n_lamelle, method = self.fs_calc.model, self.fs_calc.n_lamelle, self.fs_calc.method
+                with ProcessPoolExecutor( max_workers=self.workers, initializer=pool_init, initargs=( model, n_lamelle, method ) ) as pool:
+                    pending = deque()
+                    for batch in batches:
+                        pending.append( ( len(batch), pool.submit( pool_stream_batch, batch ) ) )
+                        if len( pending ) >= 2*self.workers:
+                            n_batch, future = pending.popleft()
+                            yield from self.handle_batch( n_batch, future.result() )
+                            if self.stopped:
+                                pool.shutdown( cancel_futures=True )
+                                return
+                    while pending and not self.stopped:
+                        n_batch, future = pending.popleft()
+                        yield from self.handle_batch( n_batch, future.result() )
             else:
-                pass # outside ( x_cen ± r ): do nothing
-        else:
-            M = ( y_2-y_1 ) / ( x_2-x_1 ) # this should now be safe
-            a = ( 1 + M**2 ) # never 0!
-            b = 2 * ( y_1*M - x_1*M*M - y_cen*M - x_cen )
-            c = ( (x_1*M)**2 + y_1**2 + y_cen**2 + x_cen**2 - r**2 ) + 2*( M*( x_1*y_cen - x_1*y_1 ) - y_1*y_cen )
+                for batch in batches:
+                    yield from self.handle_batch( len(batch), self.fs_calc.stream_batch( batch ) )
+                    if self.stopped:
+                        return
+
+
+        def handle_batch( self, n_batch, results ):
+            self.n_evaluated += n_batch
+            for circle, F in results:
+                self.add_top( circle, F )
+                self.n_results += 1
+                yield circle, F
+                if self.stop_below is not None and 0 < F < self.stop_below: # as add_top, negative/NaN FS are not critical
+                    self.stopped = True
+                    return
+
+
+        def add_top( self, circle, F ):
+            if not F > 0 or not self.top_k: # negative/NaN FS are not critical
+                return
+            if len( self.heap ) < self.top_k:
+                heapq.heappush( self.heap, ( -F, circle ) )
+            elif -self.heap[0][0] > F:
+                heapq.heapreplace( self.heap, ( -F, circle ) )
 
-            if (b**2-4*a*c) >= 0: # real roots
-                if (b**2-4*a*c) == 0: # perfect square - double root
-                    rx_1 = -b/(2*a)
-                    ry_1 = M * ( rx_1-x_1 ) + y_1
 
-                    xsi = [ rx_1, rx_1 ]
-                    ysi = [ ry_1, ry_1 ]
+        def top( self ):
+            ''' [ ( circle, FS ) ] of the lowest FS so far, ascending '''
+            return [ ( circle, -F ) for F, circle in sorted( self.heap, reverse=True ) ]
 
-                else: # two real roots
-                    rx_1 = ( -b - (b**2-4*a*c)**0.5 ) / ( 2*a )
-                    rx_2 = ( -b + (b**2-4*a*c)**0.5 ) / ( 2*a )
-                    ry_1 = M * ( rx_1-x_1 ) + y_1
-                    ry_2 = M * ( rx_2-x_1 ) + y_1
 
-                    xsi = [ rx_1, rx_2 ]
-                    ysi = [ ry_1, ry_2 ]
 
-            else: # complex roots ( no rel solution )
-                pass # do nothing
+    class calc_stats():
+        ''' accumulated wall time and calls per calculation stage and counters ( circles, iterations ),
+            filled when sircular_cylindric_fs.profile is set.
+        '''
+        def __init__( self ):
+            self.reset()
+
+
+        def reset( self ):
+            self.time = {} # stage -> seconds
+            self.calls = {} # stage -> calls
+            self.counters = {}
+
+
+        def add( self, stage, dt, n=1 ):
+            self.time[ stage ] = self.time.get( stage, 0.0 ) + dt
+            self.calls[ stage ] = self.calls.get( stage, 0 ) + n
 
-        xr = [] # init empty return vars
-        yr = []
-        ict = False
 
-        for x, y in zip( xsi, ysi ): # filter out icts within point range
-            if x >= x_1 and x <= x_2 and y >= y_1 and y <= y_2:
-                xr.append( x )
-                yr.append( y )
+        def lap( self, stage, t_0 ):
+            ''' adds the time since t_0 to stage, returns the current time for the next stage '''
+            t = time.perf_counter()
+            self.add( stage, t-t_0 )
+            return t
 
-        if xr:
-            ict = True
 
-        return ict, xr, yr
+        def count( self, name, n=1 ):
+            self.counters[ name ] = self.counters.get( name, 0 ) + n
 
 
-    def circle_bottom_y_from_x( self, x, x_cen, y_cen, radius ):
-        return y_cen - (radius**2-(x-x_cen)**2)**0.5
+        def count_max( self, name, value ):
+            self.counters[ name ] = max( self.counters.get( name, value ), value )
+
+
+        def merge( self, stats ):
+            ''' adds a to_dict() result, e.g. from a worker process '''
+            for stage, res in stats['stages'].items():
+                self.add( stage, res['time'], res['calls'] )
+            for name, value in stats['counters'].items():
+                if name.endswith( '_max' ):
+                    self.count_max( name, value )
+                else:
+                    self.count( name, value )
+
 
+        def to_dict( self ):
+            stages = { stage: { 'time': self.time[ stage ], 'calls': self.calls[ stage ], 'time_per_call': self.time[ stage ]/self.calls[ stage ] }
+                       for stage in sorted( self.time, key=self.time.get, reverse=True ) }
+            return { 'stages': stages, 'counters': dict( self.counters ) }
+
+
+        def write_json( self, path, **info ):
+            ''' stats as JSON, info ( e.g. model/case names ) is added at top level '''
+            with open( path, 'w' ) as f:
+                json.dump( dict( info, **self.to_dict() ), f, indent=4 )
+
+
+        def __str__( self ):
+            lines = [ '{:<26}{:>10}{:>10}{:>12}'.format( 'stage', 'time [s]', 'calls', 'us/call' ) ]
+            for stage, res in self.to_dict()['stages'].items():
+                lines.append( '{:<26}{:>10.3f}{:>10}{:>12.1f}'.format( stage, res['time'], res['calls'], 1e6*res['time_per_call'] ) )
+            lines += [ '{:<26}{:>10}'.format( name, value ) for name, value in self.counters.items() ]
+            return '\n'.join( lines )
 
 
 
     class failure_surface_manager(): # failure surface manager
-        def __init__( self ):
-            self.fs = {} # id & fs-es
+        def __init__( self, keep_details=None ):
+            self.fs = {} # id & fs-es with coordinates and slices
+            self.store = sircular_cylindric_fs.result_store() # scalar results (and packed coordinates) of all fs
 
             self.grid = None
-            self.score_id = {}
+            self.ranking = None # store rows in ascending FS order
+            self.evaluated = {} # fs key -> model version at calculation, also circles without failure surface
+
+            self.keep_details = keep_details # lean mode: fs dicts only kept for the keep_details most critical fs
         
         def def_fs_dict( self, keys ):
              self.fs = dict.fromkeys( keys )
         
         def sort( self, grid ):
             self.grid = grid
-            score = []
-            score_id = []
-
-            for key in self.fs:
-                score_id.append( key )
-                score.append( self.fs[key]['safety'] )
-
-            for val, key in sorted( zip(score,score_id) ):
-                self.score_id[key] = val
+            self.ranking = self.store.ranking()
 
 
         def add_fs( self, x_cen, y_cen, radius, start_x, xy ):
@@ -445,16 +1228,122 @@ class sircular_cylindric_fs():
                 "center_y": y_cen,
                 "radius": radius,
                 "start_x": start_x,
+                "end_x": xy[0][-1],
                 "x": xy[0],
                 "y": xy[1],
                 "safety": None,
-                "undrained": None
+                "iterations": None,
+                "undrained": None,
+                "slices": None,
+                "lamellas": None
             }
             self.fs[ fs_key ] = fs_definition
 
 
+        def merge_fs( self, fs_list ): # results from worker processes
+            fs_ids = []
+            for fs in fs_list:
+                fs_ids.append( self.gen_fs_key( fs['center_x'], fs['center_y'], fs['radius'] ) )
+                self.fs[ fs_ids[-1] ] = fs
+            self.commit( fs_ids )
+
+
+        def commit( self, fs_ids ):
+            ''' stores calculated fs in the result store, coordinates are only packed when all fs are kept '''
+            for key in fs_ids:
+                self.store.append( key, self.fs[ key ], store_xy=self.keep_details is None )
+            self.prune_details()
+
+
+        def prune_details( self ):
+            ''' lean mode: drops fs dicts outside the keep_details most critical, their summary stays in the store '''
+            if self.keep_details is None:
+                return
+
+            keep = dict.fromkeys( heapq.nsmallest( self.keep_details, self.fs, key=self.safety_key ) )
+            self.fs = { key: self.fs[key] for key in self.fs if key in keep }
+            for fs in self.fs.values(): # kept slices are views of their batch
+                if fs.get( 'slices' ) is not None:
+                    fs['slices'].detach()
+
+
+        def safety_key( self, key ): # ranking, missing, non-positive and NaN FS last
+            F = self.fs[ key ]['safety']
+            return F if F is not None and F > 0 else float( 'inf' )
+
+
+        def update_result( self, key, F, undrained, iterations=None ):
+            ''' new FS of a stored fs, e.g. after soil parameter changes '''
+            if key in self.fs:
+                self.fs[ key ]['safety'] = F
+                self.fs[ key ]['undrained'] = undrained
+                self.fs[ key ]['iterations'] = iterations
+            row = self.store.index[ key ]
+            self.store.safety[ row ] = F
+            self.store.flags[ row ] = self.store.UNDRAINED if undrained else 0
+
+
+        def get_safety( self, key ):
+            row = self.store.index.get( key )
+            return None if row is None else self.store.safety[ row ]
+
+
+        def get_fs( self, key ):
+            ''' fs dict if kept, otherwise its summary from the store ( None if not calculated ) '''
+            if key in self.fs:
+                return self.fs[ key ]
+            row = self.store.index.get( key )
+            return None if row is None else self.store.get_row( row )
+
+
+        def get_detailed_fs( self ): # fs with coordinates and slices
+            return list( self.fs.values() )
+
+
+        def memory_usage( self ):
+            ''' estimated bytes held by stored results (result store, dicts, coordinate lists, slice arrays and lamelle objects) '''
+            n_bytes = self.store.nbytes() + sys.getsizeof( self.fs )
+            held = set() # arrays ( or the batch arrays behind views ) already counted
+            for fs in self.fs.values():
+                n_bytes += sys.getsizeof( fs ) + 24*len( fs ) # dict + scalar values
+                for coord in [ 'x', 'y' ]:
+                    n_bytes += sys.getsizeof( fs[coord] ) + 24*len( fs[coord] )
+                if fs.get( 'slices' ) is not None:
+                    slices = fs['slices']
+                    for key in slices.array_keys():
+                        values = getattr( slices, key )
+                        owner = values if values.base is None else values.base
+                        if id( owner ) not in held:
+                            held.add( id( owner ) )
+                            n_bytes += owner.nbytes
+                if fs.get( 'lamellas' ) is not None:
+                    for lamelle in fs['lamellas'].lamellas:
+                        n_bytes += sys.getsizeof( lamelle.__dict__ ) + 24*len( lamelle.__dict__ )
+                        for soil in lamelle.soils:
+                            n_bytes += sys.getsizeof( soil.__dict__ ) + 24*len( soil.__dict__ )
+            return n_bytes
+
+
         def clear_fs( self ):
             self.fs = {}
+            self.store = sircular_cylindric_fs.result_store()
+            self.ranking = None
+            self.evaluated = {} # fs key -> model version at calculation, also circles without failure surface
+
+
+        def set_evaluated( self, calc_list, version ):
+            for circle in calc_list:
+                self.evaluated[ self.gen_fs_key( *circle ) ] = version
+
+
+        def remove_fs( self, keys ):
+            for key in keys:
+                self.fs.pop( key, None )
+                self.evaluated.pop( key, None )
+                if key in self.store.index:
+                    self.store.remove( key )
+            if keys:
+                self.ranking = None
 
 
         def gen_fs_key( self, x_cen, y_cen, radius): #:, start_x ):
@@ -466,4 +1355,190 @@ class sircular_cylindric_fs():
 
 
         def get_critical_fs( self ):
-            pass
\ No newline at end of file
+            if self.store.n == 0:
+                return None
+            return self.get_fs( self.store.keys[ self.store.top_k( 1 )[0] ] )
+
+
+
+    class result_store(): # columnar fs results, one row per circle
+        columns = [ 'center_x', 'center_y', 'radius', 'safety', 'start_x', 'end_x' ]
+        UNDRAINED = 1 # flag bits
+
+        def __init__( self, capacity=1024 ):
+            self.n = 0 # rows in use
+            self.n_xy = 0 # packed coordinates in use
+            self.index = {} # fs key -> row
+            self.keys = [] # row -> fs key
+
+            for col in self.columns:
+                setattr( self, col, np.full( capacity, np.nan ) )
+            self.flags = np.zeros( capacity, dtype=np.uint8 )
+            self.xy_offset = np.zeros( capacity, dtype=np.int64 ) # row -> first packed coordinate
+            self.xy_count = np.zeros( capacity, dtype=np.int64 )
+            self.xs = np.zeros( 0 ) # packed coordinates, allocated on first use
+            self.ys = np.zeros( 0 )
+
+
+        def append( self, key, fs, store_xy=True ):
+            ''' amortized O(1), a recalculated key overwrites its row ( and its coordinates, if they fit ) '''
+            row = self.index.get( key )
+            old_count = 0 if row is None else self.xy_count[ row ]
+            if row is None:
+                if self.n == len( self.safety ):
+                    self.grow()
+                row = self.n
+                self.n += 1
+                self.index[ key ] = row
+                self.keys.append( key )
+
+            for col in self.columns:
+                getattr( self, col )[ row ] = np.nan if fs[ col ] is None else fs[ col ]
+            self.flags[ row ] = self.UNDRAINED if fs['undrained'] else 0
+
+            n_xy = len( fs['x'] ) if store_xy else 0
+            if 0 < n_xy <= old_count: # reuse the slot of the recalculated row
+                i_from = self.xy_offset[ row ]
+                self.xs[ i_from:i_from+n_xy ] = fs['x']
+                self.ys[ i_from:i_from+n_xy ] = fs['y']
+                self.xy_count[ row ] = n_xy
+                return
+
+            self.xy_count[ row ] = 0 # old coordinates are dead
+            if self.n_xy + n_xy > len( self.xs ):
+                self.compact()
+            if self.n_xy + n_xy > len( self.xs ):
+                n_new = max( 2*len(self.xs), self.n_xy+n_xy, 32*len(self.safety) ) - len( self.xs )
+                self.xs = np.concatenate( ( self.xs, np.zeros( n_new ) ) )
+                self.ys = np.concatenate( ( self.ys, np.zeros( n_new ) ) )
+            self.xy_offset[ row ] = self.n_xy
+            self.xy_count[ row ] = n_xy
+            if n_xy:
+                self.xs[ self.n_xy:self.n_xy+n_xy ] = fs['x']
+                self.ys[ self.n_xy:self.n_xy+n_xy ] = fs['y']
+                self.n_xy += n_xy
+
+
+        def compact( self ):
+            ''' packs the coordinates of live rows, drops those of removed and recalculated rows '''
+            counts = self.xy_count[ :self.n ]
+            n_live = int( counts.sum() )
+            if n_live == self.n_xy:
+                return
+            starts = np.cumsum( counts ) - counts
+            idx = np.repeat( self.xy_offset[ :self.n ] - starts, counts ) + np.arange( n_live )
+            self.xs[ :n_live ] = self.xs[ idx ]
+            self.ys[ :n_live ] = self.ys[ idx ]
+            self.xy_offset[ :self.n ] = starts
+            self.n_xy = n_live
+
+
+        def remove( self, key ):
+            ''' the last row moves into the removed row, packed coordinates are reclaimed by compact '''
+            row = self.index.pop( key )
+            last = self.n - 1
+            if row != last:
+                for col in self.columns + [ 'flags', 'xy_offset', 'xy_count' ]:
+                    arr = getattr( self, col )
+                    arr[ row ] = arr[ last ]
+                self.keys[ row ] = self.keys[ last ]
+                self.index[ self.keys[ row ] ] = row
+            self.keys.pop()
+            self.n -= 1
+
+
+        def grow( self ):
+            for col in self.columns + [ 'flags', 'xy_offset', 'xy_count' ]:
+                arr = getattr( self, col )
+                setattr( self, col, np.concatenate( ( arr, np.zeros_like( arr ) ) ) )
+
+
+        def rank_key( self ):
+            ''' FS for ranking, non-positive and NaN FS ( not critical ) as inf '''
+            safety = self.safety[ :self.n ]
+            with np.errstate( invalid='ignore' ):
+                return np.where( safety > 0, safety, np.inf )
+
+
+        def ranking( self ):
+            ''' rows in ascending FS order, non-positive and NaN FS last '''
+            return np.argsort( self.rank_key(), kind='stable' )
+
+
+        def top_k( self, k ):
+            ''' rows of the k lowest FS, ascending '''
+            if k >= self.n:
+                return self.ranking()
+            key = self.rank_key()
+            rows = np.argpartition( key, k )[ :k ]
+            return rows[ np.argsort( key[ rows ], kind='stable' ) ]
+
+
+        def get_xy( self, row ):
+            ''' packed coordinates of a row, None if not stored '''
+            if self.xy_count[ row ] == 0:
+                return None
+            i_from = self.xy_offset[ row ]
+            i_to = i_from + self.xy_count[ row ]
+            return self.xs[ i_from:i_to ], self.ys[ i_from:i_to ]
+
+
+        def get_row( self, row ):
+            fs = { col: float( getattr( self, col )[ row ] ) for col in self.columns }
+            fs['undrained'] = bool( self.flags[ row ] & self.UNDRAINED )
+            xy = self.get_xy( row )
+            if xy:
+                fs['x'], fs['y'] = xy
+            return fs
+
+
+        def nbytes( self ):
+            arrays = sum( getattr( self, col ).nbytes for col in self.columns + [ 'flags', 'xy_offset', 'xy_count', 'xs', 'ys' ] )
+            return arrays + sys.getsizeof( self.index ) + sys.getsizeof( self.keys ) + 64*self.n # keys: tuple + 3 floats
+
+
+
+pool_fs = None # calculation instance in worker processes
+
+def pool_init( model, n_lamelle, method=None, profile=False ):
+    global pool_fs
+    pool_fs = sircular_cylindric_fs( model, n_lamelle=n_lamelle, method=method )
+    pool_fs.profile = profile
+
+
+def pool_calc_circles( calc_list, prune=False, best_fs=None ):
+    pool_fs.fs_manager.clear_fs()
+    pool_fs.prune_counts = pool_fs.new_prune_counts()
+    pool_fs.stats.reset()
+    pool_fs.calc_circles( calc_list, prune=prune, best_fs=best_fs )
+
+    fs_list = pool_fs.fs_manager.get_all_fs()
+    for fs in fs_list:
+        fs['slices'] = None # arrays reference the model, not sent back
+    return fs_list, pool_fs.prune_counts, pool_fs.stats.to_dict() if pool_fs.profile else None
+
+
+def pool_stream_batch( batch ):
+    return pool_fs.stream_batch( batch )
+
+
+
+pool_mc = None # slice batches and method in Monte Carlo worker processes
+
+def mc_fs( batches, method, params, gw_shift ):
+    ''' FS ( n_realizations, n_circles ) of parameter realizations on all circles of the slice batches '''
+    n = np.shape( params['gamma'] )[1]
+    F = []
+    for slices, center_x, radius in batches:
+        F_real, _ = method.calc_fs( slices.realizations( params, gw_shift ), np.tile( center_x, n ), np.tile( radius, n ) )
+        F.append( F_real.reshape( n, -1 ) )
+    return np.hstack( F )
+
+
+def pool_mc_init( batches, method ):
+    global pool_mc
+    pool_mc = ( batches, method )
+
+
+def pool_mc_fs( params, gw_shift ):
+    return mc_fs( pool_mc[0], pool_mc[1], params, gw_shift )